@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+    Load time and memory benchmark for CCIAtlasDomModel on synthetic atlases.
+
+    Every size runs in its own subprocess so the reported RSS is not polluted by
+    earlier runs. Example:
+        python benchmarks/bench_atlas_load.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# <BioSemSession><Name/><UID/><DataSets><OrderedDataSet><Name/></OrderedDataSet>...
+NODES_PER_DATASET = 2
+DATASETS_PER_SESSION = 10
+NODES_PER_SESSION = 4 + DATASETS_PER_SESSION * NODES_PER_DATASET
+
+
+def write_synthetic_atlas(path: Path, n_nodes: int):
+    """Write an atlas with roughly n_nodes element nodes."""
+    n_sessions = max(1, n_nodes // NODES_PER_SESSION)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0"?>\n<Atlas>\n<DataFolder>data</DataFolder>\n<Sessions>\n')
+        for s in range(n_sessions):
+            f.write(f"<BioSemSession><Name>session_{s}</Name><UID>{s}</UID><DataSets>")
+            for d in range(DATASETS_PER_SESSION):
+                f.write(f"<OrderedDataSet><Name>ods_{s}_{d}</Name></OrderedDataSet>")
+            f.write("</DataSets></BioSemSession>\n")
+        f.write("</Sessions>\n<RegionSet/>\n</Atlas>\n")
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        # ru_maxrss is in kB on Linux and bytes on macOS, this is only a fallback
+        scale = 2**20 if sys.platform == "darwin" else 2**10
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_single(atlas_path: Path):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QFile, QIODevice
+    from PySide6.QtXml import QDomDocument
+    from ccipy.atlas.cci_atlas_dom_model import CCIAtlasDomModel
+
+    rss_start = current_rss_mb()
+    t0 = time.perf_counter()
+    f = QFile(str(atlas_path))
+    f.open(QIODevice.OpenModeFlag.ReadOnly)
+    doc = QDomDocument()
+    doc.setContent(f)
+    f.close()
+    t1 = time.perf_counter()
+    rss_dom = current_rss_mb()
+
+    model = CCIAtlasDomModel()
+    model.load_from_dom(doc, str(atlas_path.parent))
+    t2 = time.perf_counter()
+    rss_model = current_rss_mb()
+
+    model.get_sessions()
+    t3 = time.perf_counter()
+
+    print(f"{t1 - t0:.3f} {t2 - t1:.3f} {t3 - t2:.3f} {rss_dom - rss_start:.1f} {rss_model - rss_dom:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--single", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(args.single)
+        return
+
+    print(f"{'nodes':>10} {'dom [s]':>9} {'model [s]':>10} {'sessions [s]':>13} {'dom [MB]':>9} {'model [MB]':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            atlas_path = Path(tmp) / f"atlas_{n}.xml"
+            write_synthetic_atlas(atlas_path, n)
+            res = subprocess.run([sys.executable, __file__, "--single", str(atlas_path)],
+                                 capture_output=True, text=True, check=True)
+            dom_s, model_s, sessions_s, dom_mb, model_mb = res.stdout.split()
+            print(f"{n:>10} {dom_s:>9} {model_s:>10} {sessions_s:>13} {dom_mb:>9} {model_mb:>11}")
+
+
+if __name__ == "__main__":
+    main()
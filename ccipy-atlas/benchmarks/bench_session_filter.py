@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+    Benchmark CCISessionFilesModel.filterAcceptsRow on a synthetic session folder.
+
+    Builds <tmp>/session/<ods_i>/S_<j> directories plus loose files, waits until
+    QFileSystemModel has listed them and times filtering every source row.
+    Example:
+        python benchmarks/bench_session_filter.py --data-sets 20 --s-dirs 500 --files 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QEventLoop, QModelIndex, QTimer  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from ccipy.atlas.cci_session_files_model import CCISessionFilesModel  # noqa: E402
+
+
+def build_tree(root: Path, n_data_sets: int, n_s_dirs: int, n_files: int) -> list[str]:
+    data_sets = [f"ods_{i}" for i in range(n_data_sets)]
+    for ds in data_sets:
+        for j in range(n_s_dirs):
+            (root / ds / f"S_{j}").mkdir(parents=True)
+        for j in range(n_files):
+            (root / ds / f"tile_{j}.tif").touch()
+    return data_sets
+
+
+def wait_until_loaded(model: CCISessionFilesModel, paths: set[str], timeout_s: float = 120):
+    pending = set(paths)
+    loop = QEventLoop()
+
+    def on_loaded(path):
+        pending.discard(path)
+        if not pending:
+            loop.quit()
+
+    model.fsm.directoryLoaded.connect(on_loaded)
+    QTimer.singleShot(int(timeout_s * 1000), loop.quit)
+    for p in paths:
+        model.fsm.fetchMore(model.fsm.index(p))
+    if pending:
+        loop.exec()
+    model.fsm.directoryLoaded.disconnect(on_loaded)
+
+
+def time_filter(model: CCISessionFilesModel, parents: list[QModelIndex], repeats: int) -> tuple[float, int]:
+    fsm = model.fsm
+    n_rows = 0
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for parent in parents:
+            rows = fsm.rowCount(parent)
+            n_rows += rows
+            for row in range(rows):
+                model.filterAcceptsRow(row, parent)
+    return time.perf_counter() - t0, n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-sets", type=int, default=20)
+    parser.add_argument("--s-dirs", type=int, default=500)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])  # noqa: F841
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "session"
+        data_sets = build_tree(root, args.data_sets, args.s_dirs, args.files)
+
+        model = CCISessionFilesModel()
+        model.set_root_and_data_sets(str(root), data_sets)
+        ds_paths = [str(root / ds) for ds in data_sets]
+        wait_until_loaded(model, {str(root), *ds_paths})
+
+        parents = [model.fsm.index(str(root)).parent(), model.fsm.index(str(root))]
+        parents += [model.fsm.index(p) for p in ds_paths]
+        elapsed, n_rows = time_filter(model, parents, args.repeats)
+
+    print(f"filtered {n_rows} rows in {elapsed:.3f} s ({n_rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,15 @@
-from ccipy.atlas.cci_atlas_dom_model import CCIAtlasDomModel
\ No newline at end of file
+from ccipy.atlas.cci_atlas_reader import CCIAtlasSummary, iter_sessions, read_atlas
+
+__all__ = ["CCIAtlasDomModel", "CCIAtlasSummary", "iter_sessions", "read_atlas"]
+
+
+def __getattr__(name):
+    # The Qt model pulls in PySide6, only import it when it is asked for
+    if name == "CCIAtlasDomModel":
+        from ccipy.atlas.cci_atlas_dom_model import CCIAtlasDomModel
+        return CCIAtlasDomModel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,22 +1,32 @@
+import os
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from PySide6.QtCore import QAbstractItemModel, QModelIndex, QPersistentModelIndex, Qt
 from PySide6.QtXml import QDomDocument, QDomNode, QDomElement
 
-
-SESSION_TAG_NAME = "BioSemSession"
-NAME_TAG_NAME = "Name"
-UID_TAG_NAME = "UID"
-DATA_FOLDER_TAG_NAME = "DataFolder"
-ORDERED_DATASET_TAG_NAME = "OrderedDataSet"
+from ccipy.atlas.cci_atlas_reader import (
+    CCIAtlasSession,
+    CCIAtlasSummary,
+    DATA_FOLDER_TAG_NAME,
+    NAME_TAG_NAME,
+    ORDERED_DATASET_TAG_NAME,
+    SESSION_TAG_NAME,
+    UID_TAG_NAME,
+)
 
 
 class CCIAtlasDomItem:
     """Wrapper for QDomNode that tracks parent/child relationships"""
+    # atlases can hold hundreds of thousands of nodes, keep the per item footprint small
+    __slots__ = ("node", "parent", "row_number", "children", "text")
+
     def __init__(self, node: QDomNode, row: int = -10, parent=None):
         self.node: QDomNode = node
         self.parent = parent
         self.row_number = row
-        self.children = []
+        # leaves share an empty tuple, a list is only allocated once there are children
+        self.children: list[CCIAtlasDomItem] | tuple = ()
         self.text = ""
         
         if node is None:
@@ -28,9 +38,14 @@ class CCIAtlasDomItem:
             return
 
         while not child.isNull():
-            self.children.append(CCIAtlasDomItem(child, len(self.children), self))
+            self.append_child(CCIAtlasDomItem(child, len(self.children), self))
             child = child.nextSibling()
 
+    def append_child(self, item: "CCIAtlasDomItem"):
+        if isinstance(self.children, tuple):
+            self.children = []
+        self.children.append(item)
+
     def child(self, row: int):
         if row < 0 or row >= len(self.children):
             return None
@@ -48,19 +63,57 @@ class CCIAtlasDomItem:
 
 class CCIAtlasDomModel(QAbstractItemModel):
     
-    def __init__(self, parent=None):
+    # attributes indexed for query() unless the caller picks others
+    DEFAULT_INDEXED_ATTRIBUTES = ("uid", "name")
+
+    def __init__(self, parent=None, indexed_attributes: tuple[str, ...] = DEFAULT_INDEXED_ATTRIBUTES):
         super().__init__(parent)
         self.dom_document: QDomDocument = QDomDocument()
         self.root_item: CCIAtlasDomItem | None = None
         self.root_element: QDomElement = QDomElement()
         self.base_folder: Path = Path()
         self._anchors: dict[str, QPersistentModelIndex] = {}
-
-    def load_from_dom(self, atlas_dom_document: QDomDocument, base_folder: str):
+        # node name -> items in document order, kept in sync by insert_node
+        self._name_index: dict[str, list[CCIAtlasDomItem]] = {}
+        # node text -> items and (attribute, value) -> items, used by query()
+        self._text_index: dict[str, list[CCIAtlasDomItem]] = {}
+        self._attr_index: dict[tuple[str, str], list[CCIAtlasDomItem]] = {}
+        self.indexed_attributes = tuple(indexed_attributes)
+        # session uid -> parsed session, built on first query and dropped on modification
+        self._session_index: dict[str, CCIAtlasSession] | None = None
+        # (name, uid) of every session node, sessions sharing a uid are merged in the index only
+        self._session_entries: list[tuple[str, str]] = []
+        self._data_dir: str = ""
+        # bumped on every modification, compared with the generation of the last save
+        self._generation = 0
+        self._saved_generation = 0
+        # resolved path of the last save, "unmodified" only holds for that file
+        self._saved_path: Path | None = None
+        self._save_executor: ThreadPoolExecutor | None = None
+
+    def load_from_dom(self, atlas_dom_document: QDomDocument, base_folder: str, summary: CCIAtlasSummary | None = None):
+        """
+        Load the model from a parsed document.
+        summary, e.g. from ccipy.atlas.cci_atlas_reader.read_atlas on the same file,
+        seeds the session index so it does not have to be rebuilt from the DOM.
+        """
         self.dom_document: QDomDocument = atlas_dom_document
         self.root_item = CCIAtlasDomItem(atlas_dom_document.documentElement(), 0)
         self.root_element = atlas_dom_document.documentElement()
         self.base_folder = Path(base_folder)
+        self._anchors.clear()
+        self._name_index = {}
+        self._text_index = {}
+        self._attr_index = {}
+        for child in self.root_item.children:
+            self._index_item(child)
+        self._invalidate_caches()
+        self._saved_generation = self._generation
+        self._saved_path = None
+        if summary is not None:
+            self._session_index = dict(summary.sessions)
+            self._session_entries = list(summary.session_entries)
+            self._data_dir = summary.data_dir
         self.dataChanged.emit(self.index(0,0), self.index(self.rowCount()-1, self.columnCount()-1))
     
 
@@ -143,25 +196,119 @@ class CCIAtlasDomModel(QAbstractItemModel):
             return False
         
         return self.insert_node(atlas_index, node)
+
+    def add_atlas_regions(self, nodes: list[QDomNode]) -> bool:
+        """Add all nodes to the RegionSet with a single insert notification."""
+        atlas_index = self.find_index_by_name("RegionSet", store_anchor=True)
+        if not atlas_index.isValid():
+            return False
+
+        return self.insert_nodes(atlas_index, nodes)
     
     def get_region_set_index(self):
         return self.find_index_by_name("RegionSet", store_anchor=True)
 
     def find_index_by_name(self, name: str, store_anchor: bool = False, column=0) -> QModelIndex:
-        if self.rowCount(QModelIndex()) == 0:
-            return QModelIndex()
-        
+        """
+        Return the index of the first node (in document order) matching name,
+        or an invalid QModelIndex if there is none.
+        name may be path qualified, e.g. "Atlas/RegionSet", see find_indexes_by_name.
+        """
         if name in self._anchors:
             return self.anchor_index(name)
 
-        # Start from the very first root index; MatchRecursive walks the whole tree
-        start = self.index(0, column, QModelIndex())
-        hits = self.match(start, Qt.DisplayRole, name, hits=1,
-                        flags=Qt.MatchExactly | Qt.MatchRecursive)
+        hits = self.find_indexes_by_name(name, max_hits=1, column=column)
         if store_anchor and hits:
             self.set_anchor(name, hits[0])
         return hits[0] if hits else QModelIndex()
 
+    def find_indexes_by_name(self, name: str, max_hits: int = -1, column=0) -> list[QModelIndex]:
+        """
+        Return the indexes of all nodes matching name, looked up in the name index.
+        A path qualified name like "BioSemSession/Name" only matches nodes whose
+        closest ancestors carry the leading path elements.
+        max_hits < 0 returns all hits.
+        """
+        *ancestors, node_name = name.strip("/").split("/")
+        hits = []
+        for item in self._name_index.get(node_name, []):
+            if max_hits >= 0 and len(hits) >= max_hits:
+                break
+            if ancestors and not self._has_ancestors(item, ancestors):
+                continue
+            hits.append(self.createIndex(item.row(), column, item))
+        return hits
+
+    def _has_ancestors(self, item: CCIAtlasDomItem, ancestors: list[str]) -> bool:
+        parent = item.parent
+        for ancestor_name in reversed(ancestors):
+            if parent is None or parent.get_node_name() != ancestor_name:
+                return False
+            parent = parent.parent
+        return True
+
+    def _index_item(self, item: CCIAtlasDomItem):
+        """Add item and its whole subtree to the name, text and attribute indexes."""
+        stack = [item]
+        while stack:
+            it = stack.pop()
+            self._name_index.setdefault(it.get_node_name(), []).append(it)
+            if it.text:
+                self._text_index.setdefault(it.text, []).append(it)
+            if self.indexed_attributes and it.node.hasAttributes():
+                elem = it.node.toElement()
+                for attr_name in self.indexed_attributes:
+                    if elem.hasAttribute(attr_name):
+                        self._attr_index.setdefault((attr_name, elem.attribute(attr_name)), []).append(it)
+            stack.extend(reversed(it.children))
+
+    def query(self, tag: str | None = None, attr: dict[str, str] | None = None, text: str | None = None,
+              child_text: dict[str, str] | None = None, column=0) -> list[QModelIndex]:
+        """
+        Return the indexes of all nodes matching every given criterion.
+            tag: node name
+            attr: attribute values, attributes in indexed_attributes are looked up
+                  in the index, others are checked on the remaining candidates
+            text: exact node text
+            child_text: texts of direct children, e.g. {"UID": "42"} finds the node owning <UID>42</UID>
+        At least one of tag, text, child_text or an indexed attribute must be given.
+        """
+        attr = attr or {}
+        candidates: list[list[CCIAtlasDomItem]] = []
+        if tag is not None:
+            candidates.append(self._name_index.get(tag, []))
+        if text is not None:
+            candidates.append(self._text_index.get(text, []))
+        for child_name, value in (child_text or {}).items():
+            candidates.append([it.parent for it in self._text_index.get(value, [])
+                               if it.parent is not None and it.get_node_name() == child_name])
+        unindexed_attrs = {}
+        for attr_name, value in attr.items():
+            if attr_name in self.indexed_attributes:
+                candidates.append(self._attr_index.get((attr_name, value), []))
+            else:
+                unindexed_attrs[attr_name] = value
+
+        if not candidates:
+            raise ValueError("query needs at least one of tag, text, child_text or an indexed attribute")
+
+        # filter the smallest candidate list by membership in the others
+        candidates.sort(key=len)
+        others = [{id(it) for it in c} for c in candidates[1:]]
+        hits = []
+        # child_text candidates hold a parent once per matching child
+        seen = set()
+        for it in candidates[0]:
+            if id(it) in seen or not all(id(it) in other for other in others):
+                continue
+            seen.add(id(it))
+            if unindexed_attrs:
+                elem = it.node.toElement()
+                if not all(elem.attribute(k) == v for k, v in unindexed_attrs.items()):
+                    continue
+            hits.append(self.createIndex(it.row(), column, it))
+        return hits
+
     def node_from_index(self, index: QModelIndex) -> QDomNode:
         """Get the QDomNode for a given QModelIndex."""
         if not index.isValid():
@@ -171,22 +318,94 @@ class CCIAtlasDomModel(QAbstractItemModel):
         return item.node
 
     def insert_node(self, parent_index: QModelIndex, dom_node: QDomNode) -> bool:
-        """Insert an existing QDomNode (with its children) under parent_index at row."""
-        parent_node = self.node_from_index(parent_index)
+        """Append an existing QDomNode (with its children) under parent_index."""
+        return self.insert_nodes(parent_index, [dom_node])
+
+    def insert_nodes(self, parent_index: QModelIndex, dom_nodes: list[QDomNode]) -> bool:
+        """
+        Append existing QDomNodes (with their children) under parent_index.
+        The DOM, the item tree and the indexes are all updated inside one
+        beginInsertRows/endInsertRows pair, so views only refresh once.
+        """
+        if not dom_nodes:
+            return True
 
-        # Ensure node belongs to this document
-        if dom_node.ownerDocument() != self.dom_document:
-            dom_node = self.dom_document.importNode(dom_node, True)  # deep copy, keeps children
+        parent_node = self.node_from_index(parent_index)
+        parent_item = parent_index.internalPointer() if parent_index.isValid() else self.root_item
+        if parent_item is None:
+            return False
 
-        row = parent_node.childNodes().length()
+        # Ensure nodes belong to this document
+        dom_nodes = [n if n.ownerDocument() == self.dom_document else self.dom_document.importNode(n, True)  # deep copy, keeps children
+                     for n in dom_nodes]
 
-        self.beginInsertRows(parent_index, row, row)
+        first_row = len(parent_item.children)
+        self.beginInsertRows(parent_index, first_row, first_row + len(dom_nodes) - 1)
 
-        parent_node.appendChild(dom_node)
+        for row, dom_node in enumerate(dom_nodes, first_row):
+            parent_node.appendChild(dom_node)
+            item = CCIAtlasDomItem(dom_node, row, parent_item)
+            parent_item.append_child(item)
+            self._index_item(item)
+        self.set_modified()
 
         self.endInsertRows()
         return True
 
+    def set_modified(self):
+        """Mark the document as changed, call after modifying get_document() directly."""
+        self._generation += 1
+        self._invalidate_caches()
+
+    def is_modified(self) -> bool:
+        """True if the document changed since it was loaded or last saved."""
+        return self._generation != self._saved_generation
+
+    def save_to_file(self, file_path: str | Path, indent: int = 1, force: bool = False) -> Future:
+        """
+        Save the document to file_path without blocking the calling thread.
+        A deep copy of the document is taken here, serialization and the write
+        happen on a worker thread. The file is replaced atomically, so readers
+        never see a partially written atlas.
+        Unless force is set, nothing is written when the document is unmodified
+        and was last saved to file_path.
+        Returns a Future resolving to True if the file was written.
+        """
+        file_path = Path(file_path).resolve()
+        if not force and not self.is_modified() and file_path == self._saved_path and file_path.exists():
+            done: Future = Future()
+            done.set_result(False)
+            return done
+
+        generation = self._generation
+        snapshot = self.dom_document.cloneNode(True).toDocument()
+        if self._save_executor is None:
+            # a single worker keeps saves ordered
+            self._save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="atlas-save")
+        return self._save_executor.submit(self._write_snapshot, snapshot, file_path, indent, generation)
+
+    def _write_snapshot(self, snapshot: QDomDocument, file_path: Path, indent: int, generation: int) -> bool:
+        data = snapshot.toString(indent).encode("utf-8")
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{file_path.name}.", suffix=".tmp", dir=file_path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates the file owner-only, keep the mode of the file we replace
+            os.chmod(tmp_name, file_path.stat().st_mode if file_path.exists() else 0o644)
+            os.replace(tmp_name, file_path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self._saved_generation = max(self._saved_generation, generation)
+        self._saved_path = file_path
+        return True
+
+    def _invalidate_caches(self):
+        """Drop everything derived from the DOM content, called whenever it is modified."""
+        self._session_index = None
+
     def set_anchor(self, name: str, index: QModelIndex) -> None:
         """
         Store a persistent index under the given name.
@@ -224,37 +443,49 @@ class CCIAtlasDomModel(QAbstractItemModel):
         return self.base_folder
 
     def get_data_dir(self):
-        #error handling?
-        dds = self.root_element.elementsByTagName(DATA_FOLDER_TAG_NAME)
-        dd = dds.at(0)
-        dde = dd.toElement()
-        return dde.text()
+        self._ensure_session_index()
+        return self._data_dir
 
     def get_sessions(self):
-        session_names = []
-        session_nodes = self.root_element.elementsByTagName(SESSION_TAG_NAME)
-        for sn in range(session_nodes.length()):
-            name = session_nodes.at(sn).firstChildElement(NAME_TAG_NAME)
-            uid = session_nodes.at(sn).firstChildElement(UID_TAG_NAME)
-            session_string = name.text()
-            session_uid = uid.text()
-            
-            session_names.append((session_string, session_uid))
-            
-        return session_names
-    
+        self._ensure_session_index()
+        return list(self._session_entries)
+
+    def get_session(self, session_uid) -> CCIAtlasSession | None:
+        return self._ensure_session_index().get(session_uid)
+
     def get_ordered_data_sets_for_session(self, session_uid):
-        ods = []
+        session = self.get_session(session_uid)
+        return list(session.ordered_data_sets) if session else []
+
+    def _ensure_session_index(self) -> dict[str, CCIAtlasSession]:
+        if self._session_index is None:
+            self._session_index = self._build_session_index()
+        return self._session_index
+
+    def _build_session_index(self) -> dict[str, CCIAtlasSession]:
+        """Parse all sessions in a single pass over the DOM."""
+        dds = self.root_element.elementsByTagName(DATA_FOLDER_TAG_NAME)
+        self._data_dir = dds.at(0).toElement().text() if dds.length() > 0 else ""
+
+        sessions: dict[str, CCIAtlasSession] = {}
+        self._session_entries = []
         session_nodes = self.root_element.elementsByTagName(SESSION_TAG_NAME)
         for sn in range(session_nodes.length()):
-            session = session_nodes.at(sn)
-            uid = session.firstChildElement(UID_TAG_NAME)
-            if not uid.text() == session_uid:
-                continue
-            session_elem = session.toElement()
+            session_elem = session_nodes.at(sn).toElement()
+            uid = session_elem.firstChildElement(UID_TAG_NAME).text()
+            name = session_elem.firstChildElement(NAME_TAG_NAME).text()
+            data_folder = session_elem.firstChildElement(DATA_FOLDER_TAG_NAME).text()
+            session = CCIAtlasSession(name, uid, data_folder)
+            self._session_entries.append((name, uid))
+
             ods_nodes = session_elem.elementsByTagName(ORDERED_DATASET_TAG_NAME)
             for od in range(ods_nodes.length()):
                 od_name = ods_nodes.at(od).firstChildElement(NAME_TAG_NAME)
-                ods.append(od_name.text())
-                
-        return ods
\ No newline at end of file
+                session.ordered_data_sets.append(od_name.text())
+
+            if uid in sessions:
+                sessions[uid].merge(session)
+            else:
+                sessions[uid] = session
+
+        return sessions
@@ -0,0 +1,137 @@
+"""
+    Headless, streaming reader for atlas files.
+    Only uses the standard library so batch tools can list sessions, datasets and
+    region sets without pulling in Qt.
+"""
+import xml.etree.ElementTree as ET
+from os import PathLike
+from typing import IO, Iterator
+
+
+SESSION_TAG_NAME = "BioSemSession"
+NAME_TAG_NAME = "Name"
+UID_TAG_NAME = "UID"
+DATA_FOLDER_TAG_NAME = "DataFolder"
+ORDERED_DATASET_TAG_NAME = "OrderedDataSet"
+REGION_SET_TAG_NAME = "RegionSet"
+
+
+class CCIAtlasSession:
+    """Parsed summary of one BioSemSession node"""
+    def __init__(self, name: str, uid: str, data_folder: str = "", ordered_data_sets: list[str] | None = None):
+        self.name = name
+        self.uid = uid
+        self.data_folder = data_folder
+        self.ordered_data_sets: list[str] = ordered_data_sets if ordered_data_sets is not None else []
+
+    def merge(self, other: "CCIAtlasSession"):
+        """Merge a later node with the same uid into this one."""
+        self.ordered_data_sets.extend(other.ordered_data_sets)
+
+
+class CCIAtlasRegionSet:
+    """Parsed summary of one RegionSet node, regions holds the names of its direct children"""
+    def __init__(self, regions: list[str] | None = None):
+        self.regions: list[str] = regions if regions is not None else []
+
+
+class CCIAtlasSummary:
+    """Everything read_atlas extracts from an atlas file"""
+    def __init__(self):
+        self.data_dir: str = ""
+        # uid -> session, nodes sharing a uid are merged
+        self.sessions: dict[str, CCIAtlasSession] = {}
+        # (name, uid) of every session node in document order, duplicate uids included
+        self.session_entries: list[tuple[str, str]] = []
+        self.region_sets: list[CCIAtlasRegionSet] = []
+
+    def add_session(self, session: CCIAtlasSession):
+        self.session_entries.append((session.name, session.uid))
+        if session.uid in self.sessions:
+            self.sessions[session.uid].merge(session)
+        else:
+            self.sessions[session.uid] = session
+
+
+def iter_atlas(source: str | PathLike | IO[bytes]) -> Iterator[tuple[str, object]]:
+    """
+    Stream an atlas file and yield ("data_dir", str), ("session", CCIAtlasSession)
+    and ("region_set", CCIAtlasRegionSet) items as soon as the corresponding
+    element is closed.
+    Elements are discarded once handled, so memory stays constant regardless of file size.
+    """
+    tags: list[str] = []
+    elems: list[ET.Element] = []
+    session: CCIAtlasSession | None = None
+    region_set: CCIAtlasRegionSet | None = None
+    # name of the open OrderedDataSet, only its first Name counts as in CCIAtlasDomModel
+    ods_name: str | None = None
+    data_dir_found = False
+
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            tags.append(elem.tag)
+            elems.append(elem)
+            if elem.tag == SESSION_TAG_NAME:
+                session = CCIAtlasSession("", "")
+            elif elem.tag == REGION_SET_TAG_NAME:
+                region_set = CCIAtlasRegionSet()
+            elif elem.tag == ORDERED_DATASET_TAG_NAME:
+                ods_name = None
+            continue
+
+        tag = tags.pop()
+        elems.pop()
+        parent_tag = tags[-1] if tags else None
+        text = elem.text or ""
+
+        if tag == DATA_FOLDER_TAG_NAME:
+            if not data_dir_found:
+                data_dir_found = True
+                yield "data_dir", text
+            if parent_tag == SESSION_TAG_NAME and session is not None and not session.data_folder:
+                session.data_folder = text
+        elif tag == NAME_TAG_NAME:
+            if parent_tag == SESSION_TAG_NAME and session is not None and not session.name:
+                session.name = text
+            elif parent_tag == ORDERED_DATASET_TAG_NAME:
+                if ods_name is None:
+                    ods_name = text
+            elif len(tags) >= 2 and tags[-2] == REGION_SET_TAG_NAME and region_set is not None:
+                region_set.regions.append(text)
+        elif tag == UID_TAG_NAME:
+            if parent_tag == SESSION_TAG_NAME and session is not None and not session.uid:
+                session.uid = text
+        elif tag == ORDERED_DATASET_TAG_NAME and session is not None:
+            session.ordered_data_sets.append(ods_name or "")
+        elif tag == SESSION_TAG_NAME and session is not None:
+            yield "session", session
+            session = None
+        elif tag == REGION_SET_TAG_NAME and region_set is not None:
+            yield "region_set", region_set
+            region_set = None
+
+        # drop the handled element so the tree never grows
+        elem.clear()
+        if elems:
+            elems[-1].remove(elem)
+
+
+def iter_sessions(source: str | PathLike | IO[bytes]) -> Iterator[CCIAtlasSession]:
+    """Stream the sessions of an atlas file, in document order."""
+    for kind, value in iter_atlas(source):
+        if kind == "session":
+            yield value  # type: ignore[misc]
+
+
+def read_atlas(source: str | PathLike | IO[bytes]) -> CCIAtlasSummary:
+    """Read sessions, data folder and region sets from an atlas file in a single pass."""
+    summary = CCIAtlasSummary()
+    for kind, value in iter_atlas(source):
+        if kind == "data_dir":
+            summary.data_dir = value  # type: ignore[assignment]
+        elif kind == "session":
+            summary.add_session(value)  # type: ignore[arg-type]
+        elif kind == "region_set":
+            summary.region_sets.append(value)  # type: ignore[arg-type]
+    return summary
@@ -0,0 +1,204 @@
+"""
+    Watches a session folder for new directories and reports them to the GUI
+    thread in batches.
+"""
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+from threading import Lock
+from typing import Callable
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from watchdog.events import DirCreatedEvent, DirMovedEvent, FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+from ccipy.atlas.cci_session_scanner import list_subdirs
+
+logger = logging.getLogger(__name__)
+
+# mount types where inotify does not see changes made by other hosts
+NETWORK_FS_TYPES = {"cifs", "smb3", "smbfs", "nfs", "nfs4", "fuse.sshfs", "9p", "afs"}
+
+
+def is_network_path(path: str | Path) -> bool:
+    """Best effort check whether path lives on a network share."""
+    path = os.path.abspath(path)
+    if sys.platform == "win32":
+        return path.startswith("\\\\")
+
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+
+    # the longest mount point that prefixes path is the one it lives on
+    best_mount, best_type = "", ""
+    for mount_point, fs_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best_mount):
+            best_mount, best_type = mount_point, fs_type
+    return best_type in NETWORK_FS_TYPES
+
+
+class _DirCreatedHandler(FileSystemEventHandler):
+    """Collects created directories from the observer thread"""
+    def __init__(self, watcher: "SessionDirWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event: FileSystemEvent):
+        if isinstance(event, DirCreatedEvent):
+            self.watcher._queue(event.src_path)
+        elif isinstance(event, DirMovedEvent):
+            self.watcher._queue(event.dest_path)
+
+
+class _ShallowPoller(threading.Thread):
+    """
+    Polling fallback for network shares. Only the root and its data set
+    directories are stat'ed, a directory is listed again only when its mtime
+    changed, instead of snapshotting the whole session tree on every poll.
+    """
+    def __init__(self, root_path: Path, data_sets: frozenset[str], interval_s: float, on_new_dir: Callable[[str], None]):
+        super().__init__(name="session-dir-poll", daemon=True)
+        self.root_path = str(root_path)
+        self.data_sets = data_sets
+        self.interval_s = interval_s
+        self._on_new_dir = on_new_dir
+        self._stop_event = threading.Event()
+        # directory -> (mtime_ns, subdirectory names)
+        self._snapshot: dict[str, tuple[int, frozenset[str]]] = {}
+
+    def run(self):
+        # the first poll only records what is already there
+        self.poll(report=False)
+        while not self._stop_event.wait(self.interval_s):
+            self.poll()
+
+    def poll(self, report: bool = True):
+        self._check(self.root_path, report)
+        root_entry = self._snapshot.get(self.root_path)
+        for name in root_entry[1] if root_entry else ():
+            if name in self.data_sets:
+                self._check(os.path.join(self.root_path, name), report)
+
+    def _check(self, dir_path: str, report: bool):
+        old = self._snapshot.get(dir_path)
+        try:
+            if old is not None and os.stat(dir_path).st_mtime_ns == old[0]:
+                return
+            mtime_ns, names = list_subdirs(dir_path)
+        except OSError:
+            self._snapshot.pop(dir_path, None)
+            return
+        names = frozenset(names)
+        self._snapshot[dir_path] = (mtime_ns, names)
+        if report:
+            for name in sorted(names - (old[1] if old else frozenset())):
+                self._on_new_dir(os.path.join(dir_path, name))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class SessionDirWatcher(QObject):
+    """
+    Watch root_path and emit directories_added with every new directory
+    seen during the last flush interval.
+    Events arrive on a watcher thread and are only queued there, the
+    timer flushing them runs on the thread owning this object, so slots
+    connected to directories_added can touch models directly.
+    use_polling None picks inotify/native watching (recursive) for local disks
+    and polling of the root and its data_sets directories for network shares,
+    where native events are not delivered.
+    A root_path that does not exist (yet), e.g. an unmounted share, is not an
+    error, starting is retried every retry_interval_ms until it can be watched.
+    """
+    directories_added = Signal(list)
+
+    def __init__(self, root_path: str | Path, use_polling: bool | None = None, flush_interval_ms: int = 500,
+                 poll_interval_s: float = 2.0, data_sets=(), retry_interval_ms: int = 5000, parent=None):
+        super().__init__(parent)
+        self.root_path = Path(root_path)
+        self.data_sets = frozenset(data_sets)
+        self.use_polling = use_polling
+        self.poll_interval_s = poll_interval_s
+        self._pending: dict[str, None] = {}  # insertion ordered set
+        self._lock = Lock()
+        self._observer: Observer | None = None
+        self._poller: _ShallowPoller | None = None
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(flush_interval_ms)
+        self._timer.timeout.connect(self.flush)
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setInterval(retry_interval_ms)
+        self._retry_timer.timeout.connect(self._start_watching)
+
+        self._timer.start()
+        self._start_watching()
+
+    @property
+    def is_watching(self) -> bool:
+        return self._observer is not None or self._poller is not None
+
+    def _start_watching(self):
+        if self.is_watching:
+            self._retry_timer.stop()
+            return
+        if not self.root_path.is_dir():
+            if not self._retry_timer.isActive():
+                logger.warning(f"Session folder {self.root_path} is not available, watching it once it is")
+                self._retry_timer.start()
+            return
+
+        use_polling = self.use_polling if self.use_polling is not None else is_network_path(self.root_path)
+        if use_polling:
+            self._poller = _ShallowPoller(self.root_path, self.data_sets, self.poll_interval_s, self._queue)
+            self._poller.start()
+        else:
+            observer = Observer()
+            try:
+                observer.schedule(_DirCreatedHandler(self), str(self.root_path), recursive=True)
+                observer.start()
+            except OSError as e:
+                # e.g. the folder went away again, or the inotify watch limit is reached
+                logger.warning(f"Could not watch session folder {self.root_path}: {str(e)}")
+                observer.stop()
+                self._retry_timer.start()
+                return
+            self._observer = observer
+        self._retry_timer.stop()
+
+    def _queue(self, path: str | bytes):
+        if isinstance(path, bytes):
+            path = os.fsdecode(path)
+        with self._lock:
+            self._pending[path] = None
+
+    def flush(self):
+        """Emit everything queued since the last flush as one batch."""
+        with self._lock:
+            if not self._pending:
+                return
+            batch = [Path(p) for p in self._pending]
+            self._pending = {}
+        self.directories_added.emit(batch)
+
+    def stop(self):
+        """Stop watching, events not yet flushed are dropped."""
+        self._timer.stop()
+        self._retry_timer.stop()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._poller is not None:
+            self._poller.stop()
+            self._poller.join()
+            self._poller = None
+        with self._lock:
+            self._pending = {}
@@ -3,9 +3,11 @@
 from PySide6.QtCore import Qt, QSortFilterProxyModel, Signal
 from PySide6.QtWidgets import QFileSystemModel
 
-# from watchdog.observers.polling import PollingObserver
 from pathlib import Path
 
+from ccipy.atlas.cci_session_dir_watcher import SessionDirWatcher
+from ccipy.atlas.cci_session_scanner import SessionDirScanner
+
 # from ccipy.utils.CCILogger import CCILogger
 # import ImgFileEventHandler
 # import logger
@@ -13,18 +15,41 @@ import os
 
 DIR_PATH_ROLE = Qt.ItemDataRole.DisplayRole + 1
 
+# where the children of a source parent sit relative to the root path
+_PARENT_OUTSIDE = 0
+_PARENT_OF_ROOT = 1
+_PARENT_INSIDE = 2
+
 
 class CCISessionFilesModel(QSortFilterProxyModel):
     directory_loaded = Signal(str)
+    # batches of S_/dataset directories added by the watcher or the scanner
+    s_directories_added = Signal(list)
+    # directories the scanner found deleted since its cached snapshot
+    s_directories_removed = Signal(list)
+    scan_finished = Signal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.fsm = QFileSystemModel()
         self.setSourceModel(self.fsm)
-        self.dataSets = []
-        self.dir_watcher = None
+        self.dataSets: frozenset[str] = frozenset()
+        self.dir_watcher: SessionDirWatcher | None = None
+        self.dir_scanner: SessionDirScanner | None = None
+        # source parent internalId -> _PARENT_* state, filterAcceptsRow is called per row
+        # so the path checks are done once per parent instead
+        self._parent_states: dict[int, int] = {}
+        # directories whose parent was not listed yet when they were reported
+        self._pending_dirs: list[Path] = []
+        # paths of removed directories, hidden until QFileSystemModel drops their nodes
+        self._removed_dirs: set[str] = set()
         #       self.fsm.directoryLoaded.connect(self.logDirLoaded)
         self.fsm.directoryLoaded.connect(self.directory_loaded)
+        self.fsm.directoryLoaded.connect(self._add_pending_dirs)
+        # internal ids are node pointers, drop them whenever nodes can go away
+        self.fsm.rowsRemoved.connect(self._clear_parent_states)
+        self.fsm.modelReset.connect(self._clear_parent_states)
+        self.fsm.rootPathChanged.connect(self._clear_parent_states)
 
     #       CCILogger.setup_logger()
 
@@ -35,22 +60,150 @@ class CCISessionFilesModel(QSortFilterProxyModel):
         idx = self.mapFromSource(self.fsm.index(path_str))
         return idx
 
-    def set_root_and_data_sets(self, root_path, ordered_data_sets):
-        self.dataSets = ordered_data_sets
+    def set_root_and_data_sets(self, root_path, ordered_data_sets, watch: bool = True, use_polling: bool | None = None,
+                               scan: bool = True, scan_cache_file=None):
+        """
+        Show root_path, filtered down to ordered_data_sets and S_ directories.
+        With watch set, new directories are picked up by a SessionDirWatcher,
+        use_polling is passed on to it (None auto detects network shares).
+        A root_path that does not exist yet is watched once it appears.
+        With scan set, a SessionDirScanner lists the session in the background
+        and fills the model from its cache first, instead of waiting for
+        QFileSystemModel to load every folder.
+        """
+        self.dataSets = frozenset(ordered_data_sets)
+        self._clear_parent_states()
+        self._pending_dirs = []
+        self._removed_dirs = set()
 
         if self.dir_watcher:
             self.dir_watcher.stop()
-
-        # self.dir_watcher = ImgFileEventHandler.SessionDirWatcher(rootPath,self.addIfSDirectory)
-
-        idx = self.mapFromSource(self.fsm.setRootPath(root_path))
+            self.dir_watcher.deleteLater()
+            self.dir_watcher = None
+        if self.dir_scanner:
+            self.dir_scanner.cancel()
+            self.dir_scanner.deleteLater()
+            self.dir_scanner = None
+
+        if watch:
+            self.dir_watcher = SessionDirWatcher(root_path, use_polling=use_polling, data_sets=self.dataSets, parent=self)
+            self.dir_watcher.directories_added.connect(self.add_s_directories)
+
+        source_idx = self.fsm.setRootPath(root_path)
+        self.invalidateFilter()
+
+        if scan:
+            self.dir_scanner = SessionDirScanner(root_path, self.dataSets, cache_file=scan_cache_file, parent=self)
+            self.dir_scanner.directories_found.connect(self.add_s_directories)
+            self.dir_scanner.directories_removed.connect(self.remove_s_directories)
+            self.dir_scanner.finished.connect(self.scan_finished)
+            self.dir_scanner.start()
+
+        idx = self.mapFromSource(source_idx)
         return idx
 
     #    def logDirLoaded(self, path):
     #        CCILogger.info(f"Dir {path} loaded")
 
     def add_if_s_directory(self, path: Path):
-        return
+        self.add_s_directories([path])
+
+    def add_s_directories(self, paths: list[Path]):
+        """
+        Make new S_ and ordered dataset directories visible without waiting for
+        QFileSystemModel to rescan their parents. Called with whole batches from
+        the watcher and the scanner, the view sees one update per batch.
+        Nothing is stat'ed on this thread for directories whose parent the model
+        has not listed yet: those parents are listed by QFileSystemModel's own
+        background thread, which inserts all their children at once.
+        """
+        root_path = self.fsm.rootPath()
+        by_parent: dict[str, list[Path]] = {}
+        for path in paths:
+            path = Path(path)
+            if not (path.name.startswith("S_") or path.name in self.dataSets):
+                continue
+            if self._removed_dirs:
+                # created again after a scan reported it removed
+                self._removed_dirs.discard(path.as_posix())
+            if path.as_posix().startswith(root_path + "/"):
+                by_parent.setdefault(path.parent.as_posix(), []).append(path)
+        if not by_parent:
+            return
+
+        child_rows: dict[str, dict[str, int]] = {}
+        added, missing = [], []
+        for parent_path, children in by_parent.items():
+            parent_idx = self._loaded_index(parent_path, child_rows)
+            if parent_idx is None:
+                # retried once the parent shows up in a listing
+                self._pending_dirs.extend(children)
+                continue
+            if self.fsm.canFetchMore(parent_idx):
+                self.fsm.fetchMore(parent_idx)
+            else:
+                names = self._child_rows(parent_path, parent_idx, child_rows)
+                missing.extend(p for p in children if p.name not in names)
+            added.extend(children)
+
+        if missing:
+            # The parent was listed before these directories existed and no change
+            # notification arrived (network shares). index() inserts their nodes, each
+            # insert would reach the view as its own rowsInserted, so the source signals
+            # are held back and the proxy is re-filtered once instead. New nodes are
+            # appended to their parent, so the rows the proxy already maps stay valid.
+            self.fsm.blockSignals(True)
+            try:
+                for path in missing:
+                    self.fsm.index(path.as_posix())
+            finally:
+                self.fsm.blockSignals(False)
+            self.invalidate()
+        if added:
+            self.s_directories_added.emit(added)
+
+    def remove_s_directories(self, paths: list[Path]):
+        """
+        Hide directories deleted while the session was closed. The scanner finds
+        them missing from a cached snapshot; QFileSystemModel may still hold their
+        nodes from an earlier listing until it notices the change itself.
+        """
+        removed = [Path(p) for p in paths]
+        if not removed:
+            return
+        removed_paths = {p.as_posix() for p in removed}
+        self._removed_dirs.update(removed_paths)
+        self._pending_dirs = [p for p in self._pending_dirs if p.as_posix() not in removed_paths]
+        self.invalidateFilter()
+        self.s_directories_removed.emit(removed)
+
+    def _child_rows(self, dir_path: str, dir_idx, cache: dict[str, dict[str, int]]) -> dict[str, int]:
+        rows = cache.get(dir_path)
+        if rows is None:
+            rows = {self.fsm.fileName(self.fsm.index(r, 0, dir_idx)): r for r in range(self.fsm.rowCount(dir_idx))}
+            cache[dir_path] = rows
+        return rows
+
+    def _loaded_index(self, dir_path: str, cache: dict[str, dict[str, int]]):
+        """Source index of dir_path if the model has listed it, found without touching the disk."""
+        root_path = self.fsm.rootPath()
+        # the root node is created by setRootPath, so this does not stat
+        idx = self.fsm.index(root_path)
+        if not idx.isValid():
+            return None
+        current = root_path
+        for part in Path(dir_path).relative_to(root_path).parts:
+            row = self._child_rows(current, idx, cache).get(part)
+            if row is None:
+                return None
+            idx = self.fsm.index(row, 0, idx)
+            current = f"{current}/{part}"
+        return idx
+
+    def _add_pending_dirs(self, _path: str):
+        if self._pending_dirs:
+            pending, self._pending_dirs = self._pending_dirs, []
+            self.add_s_directories(pending)
 
     # def filterAcceptsRow(self, source_row, source_parent):
     #     model = self.sourceModel()
@@ -88,31 +241,46 @@ class CCISessionFilesModel(QSortFilterProxyModel):
 
     #     return False
 
-    def filterAcceptsRow(self, source_row, source_parent):
-        index = self.fsm.index(source_row, 0, source_parent)
+    def _clear_parent_states(self, *args):
+        self._parent_states.clear()
+
+    def _parent_state(self, source_parent) -> int:
+        key = source_parent.internalId()
+        state = self._parent_states.get(key)
+        if state is None:
+            root_path = self.fsm.rootPath()
+            parent_path = self.fsm.filePath(source_parent)
+            if parent_path == root_path or parent_path.startswith(root_path + os.sep):
+                state = _PARENT_INSIDE
+            elif source_parent == self.fsm.index(root_path).parent():
+                state = _PARENT_OF_ROOT
+            else:
+                state = _PARENT_OUTSIDE
+            self._parent_states[key] = state
+        return state
 
-        # Only interested in directories
-        if not self.fsm.isDir(index):
+    def filterAcceptsRow(self, source_row, source_parent):
+        state = self._parent_state(source_parent)
+        # Reject if not root_path or a descendant of it
+        if state == _PARENT_OUTSIDE:
             return False
 
-        # Get the absolute path for the directory
-        dir_path = self.fsm.filePath(index)
-        if dir_path == self.fsm.rootPath():
-            return True
+        index = self.fsm.index(source_row, 0, source_parent)
 
-        # Reject if not a descendant of root_path
-        # (os.path.commonpath returns the shared prefix path)
-        if not dir_path.startswith(self.fsm.rootPath() + os.sep):
-            return False
+        # Always accept the root directory
+        if state == _PARENT_OF_ROOT:
+            return self.fsm.isDir(index) and self.fsm.filePath(index) == self.fsm.rootPath()
 
-        if Path(dir_path).name in self.dataSets:
-            return True
+        # Name check first, it is cheaper than isDir and rejects most files
+        dir_name = self.fsm.fileName(index)
+        if dir_name not in self.dataSets and not dir_name.startswith("S_"):
+            return False
 
-        dir_path_name = Path(dir_path).name
-        if dir_path_name.startswith("S_"):
-            return True
+        if self._removed_dirs and self.fsm.filePath(index) in self._removed_dirs:
+            return False
 
-        return False
+        # Only interested in directories
+        return self.fsm.isDir(index)
         # try:
         #     # List all entries in the directory
         #     for entry in os.listdir(dir_path):
@@ -0,0 +1,175 @@
+"""
+    Background scanner listing the S_ and ordered dataset directories of a
+    session folder, with a snapshot cache so reopening a project is instant.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QStandardPaths, Signal
+
+CACHE_VERSION = 1
+
+
+def default_cache_file(root_path: str | Path) -> Path:
+    """Per session cache file in the application cache location."""
+    cache_dir = Path(QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation))
+    key = hashlib.sha1(str(Path(root_path).resolve()).encode("utf-8")).hexdigest()
+    return cache_dir / "session_scans" / f"{key}.json"
+
+
+def list_subdirs(path: str) -> tuple[int, list[str]]:
+    """Return the mtime of path and the names of its subdirectories."""
+    mtime_ns = os.stat(path).st_mtime_ns
+    with os.scandir(path) as it:
+        # scandir provides the entry type without an extra stat on most platforms and on SMB
+        names = [entry.name for entry in it if entry.is_dir()]
+    return mtime_ns, names
+
+
+class SessionDirScanner(QObject):
+    """
+    Walks root_path and its ordered dataset folders on a worker pool and
+    streams the S_ and dataset directories it finds through directories_found.
+    Directories are emitted from the cache right away in start(), the scan
+    then only lists folders whose mtime changed and emits what is new, and
+    cached directories that are gone through directories_removed.
+    The signals are emitted from worker threads, connected slots on the GUI
+    thread are called through queued connections. Once cancel() returns no
+    signal is emitted anymore, so the scanner can be deleted right after it.
+    """
+    directories_found = Signal(list)
+    directories_removed = Signal(list)
+    finished = Signal()
+
+    def __init__(self, root_path: str | Path, data_sets, cache_file: str | Path | None = None,
+                 max_workers: int = 8, parent=None):
+        super().__init__(parent)
+        self.root_path = Path(root_path)
+        self.data_sets = frozenset(data_sets)
+        self.cache_file = Path(cache_file) if cache_file is not None else default_cache_file(root_path)
+        self.max_workers = max_workers
+        self._cache: dict[str, dict] = {}
+        self._emitted: set[str] = set()
+        self._emitted_lock = threading.Lock()
+        self._cancelled = threading.Event()
+        # held while checking _cancelled and emitting, and by cancel()
+        self._signal_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def _wanted(self, name: str) -> bool:
+        return name.startswith("S_") or name in self.data_sets
+
+    def start(self):
+        """Emit cached directories, then rescan in the background."""
+        self._cache = self._load_cache()
+        cached = []
+        for dir_path, entry in self._cache.items():
+            cached.extend(os.path.join(dir_path, name) for name in entry["subdirs"] if self._wanted(name))
+        self._emit(cached)
+
+        self._thread = threading.Thread(target=self._run, name="session-scan", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stop scanning, waits for a signal being emitted by a worker to return."""
+        with self._signal_lock:
+            self._cancelled.set()
+
+    def _emit_signal(self, signal, *args):
+        with self._signal_lock:
+            if not self._cancelled.is_set():
+                signal.emit(*args)
+
+    def wait(self, timeout: float | None = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _emit(self, paths: list[str]):
+        with self._emitted_lock:
+            new = [p for p in paths if p not in self._emitted]
+            self._emitted.update(new)
+        if new:
+            self._emit_signal(self.directories_found, [Path(p) for p in new])
+
+    def _scan_dir(self, dir_path: str) -> tuple[str, dict] | None:
+        if self._cancelled.is_set():
+            return None
+        cached = self._cache.get(dir_path)
+        try:
+            # a stat is much cheaper than a listing on network shares
+            if cached is not None and os.stat(dir_path).st_mtime_ns == cached["mtime_ns"]:
+                return dir_path, cached
+            mtime_ns, names = list_subdirs(dir_path)
+        except OSError:
+            return None
+        entry = {"mtime_ns": mtime_ns, "subdirs": names}
+        self._emit([os.path.join(dir_path, name) for name in names if self._wanted(name)])
+        return dir_path, entry
+
+    def _run(self):
+        snapshot: dict[str, dict] = {}
+        root = str(self.root_path)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="session-scan") as pool:
+            root_res = self._scan_dir(root)
+            if root_res is None:
+                self._emit_signal(self.finished)
+                return
+            snapshot[root] = root_res[1]
+
+            ds_dirs = [os.path.join(root, name) for name in root_res[1]["subdirs"] if name in self.data_sets]
+            for res in pool.map(self._scan_dir, ds_dirs):
+                if res is not None:
+                    snapshot[res[0]] = res[1]
+
+        if not self._cancelled.is_set():
+            removed = self._removed_since_cache(snapshot)
+            if removed:
+                with self._emitted_lock:
+                    self._emitted.difference_update(removed)
+                self._emit_signal(self.directories_removed, [Path(p) for p in removed])
+            self._save_cache(snapshot)
+            self._emit_signal(self.finished)
+
+    def _removed_since_cache(self, snapshot: dict[str, dict]) -> list[str]:
+        """Cached directories that are missing from the listings of snapshot."""
+        removed = []
+        for dir_path, entry in snapshot.items():
+            cached = self._cache.get(dir_path)
+            if cached is None or cached is entry:
+                continue
+            for name in set(cached["subdirs"]).difference(entry["subdirs"]):
+                path = os.path.join(dir_path, name)
+                if self._wanted(name):
+                    removed.append(path)
+                # the cached children of a removed dataset folder went with it
+                gone = self._cache.get(path)
+                if gone is not None:
+                    removed.extend(os.path.join(path, n) for n in gone["subdirs"] if self._wanted(n))
+        return removed
+
+    def _load_cache(self) -> dict[str, dict]:
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != CACHE_VERSION or data.get("root") != str(self.root_path):
+            return {}
+        return data.get("dirs", {})
+
+    def _save_cache(self, snapshot: dict[str, dict]):
+        data = {"version": CACHE_VERSION, "root": str(self.root_path), "dirs": snapshot}
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(prefix=self.cache_file.name, dir=self.cache_file.parent)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_name, self.cache_file)
+        except OSError:
+            # the cache is only an optimization
+            pass
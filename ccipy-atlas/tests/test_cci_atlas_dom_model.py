@@ -0,0 +1,157 @@
+import io
+
+import pytest
+
+from PySide6.QtXml import QDomDocument
+
+from ccipy.atlas import read_atlas
+from ccipy.atlas.cci_atlas_dom_model import CCIAtlasDomModel
+
+DUPLICATE_UID_XML = b"""<?xml version="1.0"?>
+<Atlas>
+  <DataFolder>data</DataFolder>
+  <Sessions>
+    <BioSemSession>
+      <Name>s1</Name>
+      <UID>u1</UID>
+      <DataSets><OrderedDataSet><Name>ods1</Name></OrderedDataSet></DataSets>
+    </BioSemSession>
+    <BioSemSession>
+      <Name>s1 copy</Name>
+      <UID>u1</UID>
+      <DataSets><OrderedDataSet><Name>ods2</Name></OrderedDataSet></DataSets>
+    </BioSemSession>
+  </Sessions>
+</Atlas>
+"""
+
+SEVERAL_NAMES_XML = b"""<?xml version="1.0"?>
+<Atlas>
+  <DataFolder>data</DataFolder>
+  <Sessions>
+    <BioSemSession>
+      <Name>s1</Name>
+      <UID>u1</UID>
+      <DataSets>
+        <OrderedDataSet><Name>ods1</Name><Name>ods1 alias</Name></OrderedDataSet>
+        <OrderedDataSet><Label>unnamed</Label></OrderedDataSet>
+        <OrderedDataSet><Name>ods2</Name></OrderedDataSet>
+      </DataSets>
+    </BioSemSession>
+  </Sessions>
+</Atlas>
+"""
+
+
+def load_model(xml: bytes, base_folder: str = ".", summary=None) -> CCIAtlasDomModel:
+    doc = QDomDocument()
+    assert doc.setContent(xml)
+    model = CCIAtlasDomModel()
+    model.load_from_dom(doc, base_folder, summary)
+    return model
+
+
+def test_sessions_with_duplicate_uid_are_all_listed():
+    for summary in (None, read_atlas(io.BytesIO(DUPLICATE_UID_XML))):
+        model = load_model(DUPLICATE_UID_XML, summary=summary)
+        assert model.get_sessions() == [("s1", "u1"), ("s1 copy", "u1")]
+        assert model.get_ordered_data_sets_for_session("u1") == ["ods1", "ods2"]
+
+
+def test_reader_matches_dom_model_for_ordered_data_sets():
+    summary = read_atlas(io.BytesIO(SEVERAL_NAMES_XML))
+    model = load_model(SEVERAL_NAMES_XML)
+    assert model.get_ordered_data_sets_for_session("u1") == ["ods1", "", "ods2"]
+    assert summary.sessions["u1"].ordered_data_sets == model.get_ordered_data_sets_for_session("u1")
+
+
+def test_save_as_writes_unmodified_document_to_other_file(tmp_path):
+    model = load_model(DUPLICATE_UID_XML, str(tmp_path))
+    first, other = tmp_path / "a.xml", tmp_path / "b.xml"
+    other.write_text("old", encoding="utf-8")
+
+    assert model.save_to_file(first).result() is True
+    assert model.save_to_file(first).result() is False
+    assert model.save_to_file(other).result() is True
+    assert "BioSemSession" in other.read_text(encoding="utf-8")
+
+
+QUERY_XML = b"""<?xml version="1.0"?>
+<Atlas>
+  <RegionSet>
+    <Region uid="r1" color="red"><Name>a</Name><Name>a</Name></Region>
+    <Region uid="r2" color="blue"><Name>b</Name></Region>
+    <Region uid="r3" color="red"><Name>b</Name></Region>
+  </RegionSet>
+</Atlas>
+"""
+
+
+def uids(model, indexes):
+    return [model.node_from_index(i).toElement().attribute("uid") for i in indexes]
+
+
+def test_query_combines_criteria():
+    model = load_model(QUERY_XML)
+    assert uids(model, model.query(tag="Region")) == ["r1", "r2", "r3"]
+    assert uids(model, model.query(attr={"uid": "r2"})) == ["r2"]
+    assert uids(model, model.query(tag="Region", attr={"color": "red"})) == ["r1", "r3"]
+    assert [model.data(i) for i in model.query(text="b")] == ["Name", "Name"]
+    assert uids(model, model.query(child_text={"Name": "b"}, attr={"color": "red"})) == ["r3"]
+    # a node with two matching children is returned once
+    assert uids(model, model.query(child_text={"Name": "a"})) == ["r1"]
+    assert model.query(tag="Region", text="nope") == []
+    with pytest.raises(ValueError):
+        model.query(attr={"color": "red"})
+
+
+def new_region(uid: str, name: str):
+    doc = QDomDocument()
+    region = doc.createElement("Region")
+    region.setAttribute("uid", uid)
+    name_elem = doc.createElement("Name")
+    name_elem.appendChild(doc.createTextNode(name))
+    region.appendChild(name_elem)
+    return region
+
+
+def test_name_lookups_follow_inserts():
+    model = load_model(QUERY_XML)
+    assert uids(model, model.find_indexes_by_name("Region")) == ["r1", "r2", "r3"]
+    assert len(model.find_indexes_by_name("Name")) == 4
+    assert len(model.find_indexes_by_name("Region/Name", max_hits=2)) == 2
+    assert model.find_indexes_by_name("RegionSet/Name") == []
+    assert model.data(model.find_index_by_name("Atlas/RegionSet")) == "RegionSet"
+
+    region_set = model.find_index_by_name("RegionSet")
+    assert model.insert_node(region_set, new_region("r4", "d"))
+    assert model.insert_nodes(region_set, [new_region("r5", "e"), new_region("r6", "f")])
+
+    assert uids(model, model.find_indexes_by_name("Region")) == ["r1", "r2", "r3", "r4", "r5", "r6"]
+    assert uids(model, model.find_indexes_by_name("RegionSet/Region")[3:]) == ["r4", "r5", "r6"]
+    names = model.find_indexes_by_name("Atlas/RegionSet/Region/Name")
+    assert [model.data(i.siblingAtColumn(1)) for i in names[4:]] == ["d", "e", "f"]
+    assert uids(model, model.query(attr={"uid": "r5"})) == ["r5"]
+
+
+def test_bulk_insert_is_one_row_insertion_mirroring_the_dom():
+    model = load_model(QUERY_XML)
+    region_set = model.find_index_by_name("RegionSet")
+    inserted = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((model.data(parent), first, last)))
+
+    regions = [new_region(f"n{i}", f"name {i}") for i in range(5)]
+    assert model.insert_nodes(region_set, regions)
+
+    assert inserted == [("RegionSet", 3, 7)]
+    assert model.rowCount(region_set) == 8
+    dom_children = model.node_from_index(region_set).childNodes()
+    assert dom_children.count() == 8
+    for row in range(3, 8):
+        index = model.index(row, 0, region_set)
+        assert model.data(index) == "Region"
+        assert model.node_from_index(index) == dom_children.item(row)
+        assert model.parent(index) == region_set
+        name = model.index(0, 0, index)
+        assert (model.data(name), model.data(name.siblingAtColumn(1))) == ("Name", f"name {row - 3}")
+    assert model.is_modified()
@@ -0,0 +1,50 @@
+import io
+import subprocess
+import sys
+
+from ccipy.atlas import read_atlas, iter_sessions
+
+ATLAS_XML = b"""<?xml version="1.0"?>
+<Atlas>
+  <DataFolder>data</DataFolder>
+  <Sessions>
+    <BioSemSession>
+      <Name>s1</Name>
+      <UID>u1</UID>
+      <DataSets>
+        <OrderedDataSet><Name>ods1</Name></OrderedDataSet>
+        <OrderedDataSet><Name>ods2</Name></OrderedDataSet>
+      </DataSets>
+    </BioSemSession>
+    <BioSemSession>
+      <Name>s2</Name>
+      <UID>u2</UID>
+    </BioSemSession>
+  </Sessions>
+  <RegionSet>
+    <Region><Name>reg1</Name></Region>
+    <Region><Name>reg2</Name></Region>
+  </RegionSet>
+</Atlas>
+"""
+
+
+def test_read_atlas():
+    summary = read_atlas(io.BytesIO(ATLAS_XML))
+    assert summary.data_dir == "data"
+    assert list(summary.sessions) == ["u1", "u2"]
+    assert summary.sessions["u1"].name == "s1"
+    assert summary.sessions["u1"].ordered_data_sets == ["ods1", "ods2"]
+    assert summary.sessions["u2"].ordered_data_sets == []
+    assert [rs.regions for rs in summary.region_sets] == [["reg1", "reg2"]]
+
+
+def test_iter_sessions():
+    sessions = [(s.name, s.uid) for s in iter_sessions(io.BytesIO(ATLAS_XML))]
+    assert sessions == [("s1", "u1"), ("s2", "u2")]
+
+
+def test_reader_does_not_import_qt():
+    code = "import sys, ccipy.atlas; ccipy.atlas.read_atlas; print('PySide6' in sys.modules)"
+    res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert res.stdout.strip() == "False"
@@ -0,0 +1,125 @@
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest  # noqa: E402
+from PySide6.QtCore import QCoreApplication, QEventLoop  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from ccipy.atlas.cci_session_dir_watcher import SessionDirWatcher  # noqa: E402
+from ccipy.atlas.cci_session_files_model import CCISessionFilesModel  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def spin(seconds: float, until=lambda: False):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline and not until():
+        QCoreApplication.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 20)
+        time.sleep(0.01)
+
+
+def test_polling_watcher_reports_new_directories_in_one_batch(app, tmp_path):
+    (tmp_path / "ods1").mkdir()
+    (tmp_path / "other").mkdir()
+    watcher = SessionDirWatcher(tmp_path, use_polling=True, poll_interval_s=0.05, flush_interval_ms=300,
+                                data_sets=["ods1"])
+    batches = []
+    watcher.directories_added.connect(batches.append)
+    spin(0.2)  # first poll records the existing tree
+
+    for path in (tmp_path / "ods1" / "S_1", tmp_path / "ods1" / "S_2", tmp_path / "S_3", tmp_path / "other" / "S_4"):
+        path.mkdir()
+    spin(2, until=lambda: batches)
+    spin(0.4)
+    watcher.stop()
+
+    # directories below folders that are not data sets are not polled
+    assert len(batches) == 1
+    assert sorted(p.name for p in batches[0]) == ["S_1", "S_2", "S_3"]
+    assert not watcher.is_watching
+
+
+def test_missing_root_is_watched_once_it_appears(app, tmp_path):
+    root = tmp_path / "not_mounted_yet"
+    watcher = SessionDirWatcher(root, use_polling=True, poll_interval_s=0.05, retry_interval_ms=50)
+    assert not watcher.is_watching
+    root.mkdir()
+    spin(2, until=lambda: watcher.is_watching)
+    assert watcher.is_watching
+    watcher.stop()
+
+
+def test_model_accepts_missing_root(app, tmp_path):
+    model = CCISessionFilesModel()
+    model.set_root_and_data_sets(str(tmp_path / "missing"), ["ods1"], scan=False)
+    assert model.dir_watcher is not None and not model.dir_watcher.is_watching
+    model.dir_watcher.stop()
+
+
+def test_batch_is_applied_as_one_layout_change(app, tmp_path):
+    (tmp_path / "ods1" / "S_1").mkdir(parents=True)
+    model = CCISessionFilesModel()
+    model.set_root_and_data_sets(str(tmp_path), ["ods1"], watch=False, scan=False)
+    ods = str(tmp_path / "ods1")
+    spin(5, until=lambda: model.fsm.index(ods).isValid() and model.fsm.rowCount(model.fsm.index(str(tmp_path))) > 0)
+    model.fsm.fetchMore(model.fsm.index(ods))
+    spin(5, until=lambda: model.fsm.rowCount(model.fsm.index(ods)) == 1)
+
+    new_dirs = [tmp_path / "ods1" / f"S_{i}" for i in range(2, 6)]
+    for path in new_dirs:
+        path.mkdir()
+    events = []
+    model.rowsInserted.connect(lambda *args: events.append("rowsInserted"))
+    model.layoutChanged.connect(lambda *args: events.append("layoutChanged"))
+    model.add_s_directories(new_dirs)
+
+    assert events == ["layoutChanged"]
+    assert model.fsm.rowCount(model.fsm.index(ods)) == 5
+    source_indexes = [model.fsm.index(str(p)) for p in new_dirs]
+    assert all(model.filterAcceptsRow(i.row(), i.parent()) for i in source_indexes)
+
+
+def test_unlisted_parents_are_listed_in_the_background(app, tmp_path):
+    (tmp_path / "ods1" / "S_1").mkdir(parents=True)
+    (tmp_path / "ods1" / "S_2").mkdir()
+    model = CCISessionFilesModel()
+    model.set_root_and_data_sets(str(tmp_path), ["ods1"], watch=False, scan=False)
+    added = []
+    model.s_directories_added.connect(added.extend)
+
+    # reported before the root listing arrived, kept until it did
+    new_dirs = [tmp_path / "ods1" / "S_1", tmp_path / "ods1" / "S_2"]
+    model.add_s_directories(new_dirs)
+    ods = str(tmp_path / "ods1")
+    spin(5, until=lambda: len(added) == 2 and model.fsm.rowCount(model.fsm.index(ods)) == 2)
+
+    assert sorted(added) == new_dirs
+    assert model.fsm.rowCount(model.fsm.index(ods)) == 2
+
+
+def test_removed_directories_are_hidden(app, tmp_path):
+    (tmp_path / "S_1").mkdir()
+    (tmp_path / "S_2").mkdir()
+    model = CCISessionFilesModel()
+    model.set_root_and_data_sets(str(tmp_path), [], watch=False, scan=False)
+    root = str(tmp_path)
+    spin(5, until=lambda: model.fsm.rowCount(model.fsm.index(root)) == 2)
+    removed = []
+    model.s_directories_removed.connect(removed.extend)
+
+    model.remove_s_directories([tmp_path / "S_2"])
+
+    assert removed == [tmp_path / "S_2"]
+    rows = {model.fsm.fileName(model.fsm.index(r, 0, model.fsm.index(root))): r for r in range(2)}
+    root_idx = model.fsm.index(root)
+    assert model.filterAcceptsRow(rows["S_1"], root_idx)
+    assert not model.filterAcceptsRow(rows["S_2"], root_idx)
+
+    # shown again once it is reported as added
+    model.add_s_directories([tmp_path / "S_2"])
+    assert model.filterAcceptsRow(rows["S_2"], root_idx)
@@ -0,0 +1,108 @@
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest  # noqa: E402
+from PySide6.QtCore import QCoreApplication, QEventLoop  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from ccipy.atlas import cci_session_scanner  # noqa: E402
+from ccipy.atlas.cci_session_scanner import SessionDirScanner  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def listed(monkeypatch):
+    """Directories passed to list_subdirs by the scanners."""
+    calls = []
+    list_subdirs = cci_session_scanner.list_subdirs
+
+    def counting_list_subdirs(path):
+        calls.append(os.path.basename(path))
+        return list_subdirs(path)
+
+    monkeypatch.setattr(cci_session_scanner, "list_subdirs", counting_list_subdirs)
+    return calls
+
+
+def scan(root, cache_file, data_sets=("ods1",)):
+    scanner = SessionDirScanner(root, data_sets, cache_file=cache_file)
+    found = []
+    scanner.directories_found.connect(lambda paths: found.extend(p.name for p in paths))
+    scanner.start()
+    scanner.wait(5)
+    QCoreApplication.processEvents(QEventLoop.ProcessEventsFlag.AllEvents)
+    return sorted(found)
+
+
+def test_rescan_uses_cache_until_mtime_changes(app, tmp_path, listed):
+    root = tmp_path / "session"
+    for path in (root / "S_1", root / "ods1" / "S_2", root / "other" / "S_3"):
+        path.mkdir(parents=True)
+    cache_file = tmp_path / "cache.json"
+
+    assert scan(root, cache_file) == ["S_1", "S_2", "ods1"]
+    assert sorted(listed) == ["ods1", "session"]
+    assert cache_file.exists()
+
+    # unchanged folders are emitted from the cache and not listed again
+    listed.clear()
+    assert scan(root, cache_file) == ["S_1", "S_2", "ods1"]
+    assert listed == []
+
+    # only the folder whose mtime changed is listed
+    (root / "ods1" / "S_4").mkdir()
+    mtime = time.time() + 10
+    os.utime(root / "ods1", (mtime, mtime))
+    assert scan(root, cache_file) == ["S_1", "S_2", "S_4", "ods1"]
+    assert listed == ["ods1"]
+
+
+def test_no_signals_after_cancel(app, tmp_path, monkeypatch):
+    (tmp_path / "S_1").mkdir()
+    list_subdirs = cci_session_scanner.list_subdirs
+
+    def slow_list_subdirs(path):
+        time.sleep(0.2)
+        return list_subdirs(path)
+
+    monkeypatch.setattr(cci_session_scanner, "list_subdirs", slow_list_subdirs)
+    scanner = SessionDirScanner(tmp_path, (), cache_file=tmp_path / "cache.json")
+    emitted = []
+    scanner.directories_found.connect(emitted.append)
+    scanner.finished.connect(lambda: emitted.append("finished"))
+    scanner.start()
+    scanner.cancel()
+    scanner.wait(5)
+    QCoreApplication.processEvents(QEventLoop.ProcessEventsFlag.AllEvents)
+
+    assert emitted == []
+    assert not (tmp_path / "cache.json").exists()
+
+
+def test_deleted_cached_folders_are_reported_removed(app, tmp_path):
+    root = tmp_path / "session"
+    for path in (root / "S_1", root / "ods1" / "S_2", root / "ods1" / "S_3"):
+        path.mkdir(parents=True)
+    cache_file = tmp_path / "cache.json"
+    assert scan(root, cache_file) == ["S_1", "S_2", "S_3", "ods1"]
+
+    (root / "ods1" / "S_3").rmdir()
+    mtime = time.time() + 10
+    os.utime(root / "ods1", (mtime, mtime))
+    scanner = SessionDirScanner(root, ("ods1",), cache_file=cache_file)
+    removed = []
+    scanner.directories_removed.connect(removed.extend)
+    scanner.start()
+    scanner.wait(5)
+    QCoreApplication.processEvents(QEventLoop.ProcessEventsFlag.AllEvents)
+    assert removed == [root / "ods1" / "S_3"]
+
+    # the snapshot was updated, the next scan neither finds nor removes it
+    assert scan(root, cache_file) == ["S_1", "S_2", "ods1"]
+
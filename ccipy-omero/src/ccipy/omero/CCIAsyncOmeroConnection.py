@@ -0,0 +1,126 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ccipy.omero.CCIOmeroConnectionPool import OmeroConnectionPool
+
+
+class AsyncOmeroConnection:
+    """
+    asyncio front end for OmeroConnection.
+    Every call checks a connection out of an OmeroConnectionPool and runs the
+    blocking OmeroConnection method on a bounded thread pool, so one event loop
+    can keep up to max_concurrency OMERO requests in flight.
+
+    Cancelling a call that has not started yet skips it. A call already
+    running on a worker thread cannot be interrupted, it finishes in the
+    background and its connection goes back to the pool.
+    """
+
+    def __init__(self, pool: OmeroConnectionPool, max_concurrency: int | None = None):
+        self.pool = pool
+        self.max_concurrency = max_concurrency or pool.max_size
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="omero-async")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    @classmethod
+    def from_session(cls, hostname: str, port: str, session_key: str, pool_size: int = 4,
+                     max_concurrency: int | None = None) -> "AsyncOmeroConnection":
+        return cls(OmeroConnectionPool(hostname, port, session_key, max_size=pool_size), max_concurrency)
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def call(self, method_name: str, *args, **kwargs):
+        """Run any OmeroConnection method by name on a pooled connection."""
+        cancelled = threading.Event()
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._executor, self._run, cancelled, method_name, args, kwargs)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    def _run(self, cancelled: threading.Event, method_name: str, args, kwargs):
+        if cancelled.is_set():
+            return None
+        with self.pool.connection() as conn:
+            return getattr(conn, method_name)(*args, **kwargs)
+
+    async def get_user(self):
+        return await self.call("get_user")
+
+    async def get_user_id(self):
+        return await self.call("get_user_id")
+
+    async def get_logged_in_user_name(self) -> str:
+        return await self.call("get_logged_in_user_name")
+
+    async def get_logged_in_user_full_name(self) -> str:
+        return await self.call("get_logged_in_user_full_name")
+
+    async def get_user_groups(self):
+        return await self.call("get_user_groups")
+
+    async def get_default_omero_group(self) -> str:
+        return await self.call("get_default_omero_group")
+
+    async def get_user_project_ids(self, user_id):
+        return await self.call("get_user_project_ids", user_id)
+
+    async def get_user_projects(self, user_id):
+        return await self.call("get_user_projects", user_id)
+
+    async def get_dataset(self, dataSetId: int):
+        return await self.call("get_dataset", dataSetId)
+
+    async def get_image(self, imageID: int):
+        return await self.call("get_image", imageID)
+
+    async def create_dataset(self, project_id: int, dataset_name: str):
+        return await self.call("create_dataset", project_id, dataset_name)
+
+    async def create_project(self, project_name):
+        return await self.call("create_project", project_name)
+
+    async def create_and_link_local_attachment(self, attachment_file: str, image_id: int, *args, **kwargs):
+        return await self.call("create_and_link_local_attachment", attachment_file, image_id, *args, **kwargs)
+
+    async def create_tag_annotation(self, tag_value):
+        return await self.call("create_tag_annotation", tag_value)
+
+    async def set_annotation_on_image(self, image, annotation):
+        return await self.call("set_annotation_on_image", image, annotation)
+
+    async def set_description_on_image(self, image, descr):
+        return await self.call("set_description_on_image", image, descr)
+
+    async def set_comment_on_image(self, image, comment):
+        return await self.call("set_comment_on_image", image, comment)
+
+    async def link_tags(self, image_ids, tags, **kwargs):
+        return await self.call("link_tags", image_ids, tags, **kwargs)
+
+    async def set_descriptions(self, descriptions: dict[int, str], **kwargs):
+        return await self.call("set_descriptions", descriptions, **kwargs)
+
+    async def add_comments(self, comments: dict[int, str], **kwargs):
+        return await self.call("add_comments", comments, **kwargs)
+
+    async def get_images_metadata(self, image_ids, **kwargs) -> dict[str, list]:
+        return await self.call("get_images_metadata", image_ids, **kwargs)
+
+    async def get_dataset_metadata(self, dataset_id: int, **kwargs) -> dict[str, list]:
+        return await self.call("get_dataset_metadata", dataset_id, **kwargs)
@@ -0,0 +1,78 @@
+import logging
+import numbers
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# objects sent per saveArray/saveAndReturnArray call in the bulk methods
+DEFAULT_BATCH_CHUNK_SIZE = 500
+
+
+class BatchResult:
+    """Outcome of a bulk call: the keys that succeeded and an error message per failed key"""
+    def __init__(self):
+        self.succeeded: list = []
+        self.failed: dict = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def __repr__(self):
+        return f"BatchResult(succeeded={len(self.succeeded)}, failed={len(self.failed)})"
+
+
+def chunks(items: list, chunk_size: int):
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+def check_tags(tags) -> list:
+    """
+    Return tags as a list, each must be a tag value (str) or the id of a tag
+    annotation (any integer type). Raises TypeError naming the first other value.
+    """
+    tags = list(tags)
+    for tag in tags:
+        # bool is an Integral but never meant as an annotation id
+        if isinstance(tag, bool) or not isinstance(tag, (str, numbers.Integral)):
+            raise TypeError(f"tags must be tag values (str) or tag annotation ids (int), got {tag!r}")
+    return tags
+
+
+def save_in_chunks(update, objects: list, keys: list, chunk_size: int, result: BatchResult, lock=None,
+                   service_opts=None, return_objects: bool = True) -> list:
+    """
+    Save objects through an OMERO update service with one server call per chunk.
+    If a chunk fails, its objects are saved one by one so a single bad object
+    only fails itself. keys[i] is recorded in result for objects[i].
+    lock, if given, is held during each server call.
+    Returns the saved objects (None where saving failed) when return_objects is set.
+    """
+    lock = lock if lock is not None else nullcontext()
+    saved: list = []
+    for start in range(0, len(objects), chunk_size):
+        obj_chunk = objects[start:start + chunk_size]
+        key_chunk = keys[start:start + chunk_size]
+        try:
+            with lock:
+                if return_objects:
+                    saved.extend(update.saveAndReturnArray(obj_chunk, service_opts))
+                else:
+                    update.saveArray(obj_chunk, service_opts)
+            result.succeeded.extend(key_chunk)
+            continue
+        except Exception as e:
+            logger.warning(f"Saving a chunk of {len(obj_chunk)} objects failed, retrying one by one: {str(e)}")
+
+        for obj, key in zip(obj_chunk, key_chunk):
+            try:
+                with lock:
+                    saved_obj = update.saveAndReturnObject(obj, service_opts)
+                saved.append(saved_obj)
+                result.succeeded.append(key)
+            except Exception as e:
+                logger.warning(f"Failed to save object for {key}: {str(e)}")
+                saved.append(None)
+                result.failed[key] = str(e)
+    return saved
@@ -0,0 +1,92 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable
+
+# seconds an entry stays valid, per object type
+DEFAULT_CACHE_TTLS = {
+    "user": 300.0,
+    "group": 300.0,
+    "project": 60.0,
+    "dataset": 60.0,
+    "image": 30.0,
+}
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Size bounded LRU cache whose entries expire after a per kind time to live.
+    Kinds without a ttl are never cached. Thread safe.
+    """
+
+    def __init__(self, ttls: dict[str, float] | None = None, max_size: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttls = dict(DEFAULT_CACHE_TTLS if ttls is None else ttls)
+        self.max_size = max_size
+        self._clock = clock
+        # (kind, key) -> (expires_at, value), most recently used last
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+
+    def get(self, kind: str, key: Hashable, default=None):
+        with self._lock:
+            value = self._get_locked(kind, key)
+        return default if value is _MISSING else value
+
+    def _get_locked(self, kind: str, key: Hashable):
+        entry = self._entries.get((kind, key))
+        if entry is not None and entry[0] > self._clock():
+            self._entries.move_to_end((kind, key))
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+            return entry[1]
+        if entry is not None:
+            del self._entries[(kind, key)]
+        self.misses[kind] = self.misses.get(kind, 0) + 1
+        return _MISSING
+
+    def put(self, kind: str, key: Hashable, value):
+        ttl = self.ttls.get(kind)
+        if not ttl:
+            return
+        with self._lock:
+            self._entries[(kind, key)] = (self._clock() + ttl, value)
+            self._entries.move_to_end((kind, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, kind: str, key: Hashable, loader: Callable[[], Any]):
+        """Return the cached value or call loader and cache its result, None results are not cached."""
+        if not self.ttls.get(kind):
+            return loader()
+        with self._lock:
+            value = self._get_locked(kind, key)
+        if value is not _MISSING:
+            return value
+        value = loader()
+        if value is not None:
+            self.put(kind, key, value)
+        return value
+
+    def invalidate(self, kind: str | None = None, key: Hashable = _MISSING):
+        """Drop one entry, all entries of a kind, or everything when kind is None."""
+        with self._lock:
+            if kind is None:
+                self._entries.clear()
+            elif key is not _MISSING:
+                self._entries.pop((kind, key), None)
+            else:
+                for k in [k for k in self._entries if k[0] == kind]:
+                    del self._entries[k]
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Hit and miss counters per kind."""
+        with self._lock:
+            kinds = set(self.hits) | set(self.misses)
+            return {k: {"hits": self.hits.get(k, 0), "misses": self.misses.get(k, 0)} for k in sorted(kinds)}
+
+    def __len__(self):
+        return len(self._entries)
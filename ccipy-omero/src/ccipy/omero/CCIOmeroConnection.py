@@ -1,26 +1,97 @@
+import mimetypes
+import time
 from threading import Lock
+from typing import Callable
+import Ice
 import omero
 import omero.rtypes
 from omero.gateway import BlitzGateway, CommentAnnotationWrapper, DatasetWrapper, ImageWrapper
+from omero.sys import ParametersI
 from common import logger
+from ccipy.omero.CCIOmeroBatch import DEFAULT_BATCH_CHUNK_SIZE, BatchResult, check_tags, chunks, save_in_chunks
+from ccipy.omero.CCIOmeroCache import TTLCache
+from ccipy.omero.CCIOmeroConnectionPool import OmeroConnectionPool
+from ccipy.omero.CCIOmeroPixels import TiledPixelReader
+from ccipy.omero.CCIOmeroQuery import GetOrCreate, images_metadata, iter_pages, oldest_id_by_name
+from ccipy.omero.CCIOmeroSession import ReconnectingSession, retry_on_session_loss
+from ccipy.omero.CCIOmeroUpload import OmeroUploader, UploadReport
 
-class OmeroConnection:
-        
-    def __init__(self, hostname: str, port: str, token: str):
+# objects fetched per server call when listing
+DEFAULT_PAGE_SIZE = 500
+
+# shared by all connections of the process, pooled connections upload concurrently
+_get_or_create = GetOrCreate()
+
+
+class OmeroConnection(ReconnectingSession):
+    # the connection dropped, the session can be rejoined
+    TRANSPORT_ERRORS = (
+        Ice.ConnectionLostException,
+        Ice.ConnectFailedException,
+        Ice.TimeoutException,
+        Ice.CommunicatorDestroyedException,
+    )
+    # the session is gone on the server, its key cannot be joined again
+    SESSION_EXPIRED_ERRORS = (
+        Ice.ObjectNotExistException,
+        omero.RemovedSessionException,
+        omero.SessionTimeoutException,
+    )
+
+    def __init__(self, hostname: str, port: str, token: str, cache_ttls: dict[str, float] | None = None,
+                 cache_size: int = 1024, keepalive_interval: float | None = None, max_reconnect_attempts: int = 3,
+                 keep_session_open: bool = False, session_factory: Callable[[], str] | None = None):
+        """
+        token is the key of the session to join.
+        cache_ttls enables caching of user, group, project, dataset and image
+        lookups, mapping those kinds to a time to live in seconds
+        (see CCIOmeroCache.DEFAULT_CACHE_TTLS). None disables the cache.
+        keepalive_interval starts a background thread pinging the session every
+        that many seconds and reconnecting when it has dropped.
+        Idempotent lookups that fail because the connection dropped are retried
+        after up to max_reconnect_attempts reconnects. When the session itself
+        has expired they fail, unless session_factory is given: it returns
+        the key of a new session (e.g. by logging in again) to continue with.
+        keep_session_open leaves the session alive on the server when this
+        connection is closed or garbage collected, so short lived workers can
+        keep joining the same session key instead of logging in again.
+        """
         self.omero_token = token
         self.hostname = hostname
         self.port = port
-        self.conn: BlitzGateway
-        
+        self.conn: BlitzGateway = None
+        self._cache = TTLCache(cache_ttls, cache_size) if cache_ttls is not None else None
+        self.keep_session_open = keep_session_open
+        self._init_session_recovery(max_reconnect_attempts, session_factory)
+
         self._mutex = Lock()
 
         self._connect_to_omero(hostname,port,token)
+
+        if keepalive_interval:
+            self._start_keepalive(keepalive_interval)
         
     def __del__(self):
         self._close_omero_connection()
     
     def kill_session(self):
         self._close_omero_connection(True)
+
+    def close(self):
+        """Close this connection without killing the session, which other connections may share."""
+        self._close_omero_connection()
+
+    def is_alive(self) -> bool:
+        """Ping the server, False if the session is gone."""
+        with self._mutex:
+            try:
+                return bool(self.conn.keepAlive())
+            except Exception:
+                return False
+
+    def get_connection_pool(self, max_size: int = 4) -> OmeroConnectionPool:
+        """Create a pool of connections joined to the same session as this one."""
+        return OmeroConnectionPool(self.hostname, self.port, self.omero_token, max_size=max_size)
         
     def get_omero_connection(self):
         return self.conn
@@ -29,85 +100,200 @@ class OmeroConnection:
         logger.info(f"Opening connection to OMERO with token: {token}, hostname: {hostname}")    
         self.omero_token = token
 
+        start = time.perf_counter()
         self.conn = BlitzGateway(host=hostname, port=port)
         is_connected = self.conn.connect(token)
     
         if not is_connected:
             logger.warning(f"Failed to connect to OMERO with token: {token}")
             raise ConnectionError("Failed to connect to OMERO")
+        self.session_setup_seconds = time.perf_counter() - start
+        logger.info(f"OMERO session setup took {self.session_setup_seconds:.3f} s")
 
     def _close_omero_connection(self,hardClose=False):
+        if hasattr(self, "_keepalive_stop"):
+            self._stop_keepalive()
         logger.info(f"Closing connection to OMERO with token: {self.omero_token}") if self.omero_token is not None else logger.info("Closing connection to OMERO without token")
         if self.conn:
+            if self.keep_session_open and not hardClose:
+                try:
+                    # the session outlives this client, other processes may join it later
+                    self.conn.c.getSession().detachOnDestroy()
+                except Exception as e:
+                    logger.warning(f"Failed to detach from OMERO session: {str(e)}")
             self.conn.close(hard=hardClose)
 
+    def _cached(self, kind: str, key, loader):
+        if self._cache is None:
+            return loader()
+        return self._cache.get_or_load(kind, key, loader)
+
+    def invalidate_cache(self, kind: str | None = None):
+        """Drop cached lookups of one kind ("user", "group", "project", "dataset", "image") or all of them."""
+        if self._cache is not None:
+            self._cache.invalidate(kind)
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        """Cache hits and misses per kind, empty when caching is disabled."""
+        return self._cache.stats() if self._cache is not None else {}
+
+    @retry_on_session_loss
     def get_user(self):
-        with self._mutex:
-            return self.conn.getUser()
+        def load():
+            with self._mutex:
+                return self.conn.getUser()
+        return self._cached("user", "current", load)
 
+    @retry_on_session_loss
     def get_user_id(self):
         with self._mutex:
             return self.conn.getUserId()
 
+    @retry_on_session_loss
     def get_logged_in_user_name(self) -> str:
         with self._mutex:
             user = self.conn.getUser()
         return user.getName() if user else "Unknown User"
     
+    @retry_on_session_loss
     def get_logged_in_user_full_name(self) -> str:
         with self._mutex:
             user = self.conn.getUser()
         return user.getFullName() if user else "Unknown User"
 
+    @retry_on_session_loss
     def get_user_groups(self):
-        groups = []
-        with self._mutex:
-            for group in self.conn.getGroupsMemberOf():
-                groups.append(group.getName())
-        return groups
+        def load():
+            groups = []
+            with self._mutex:
+                for group in self.conn.getGroupsMemberOf():
+                    groups.append(group.getName())
+            return groups
+        return list(self._cached("group", "member_of", load))
 
     def set_group_name_for_session(self, group):
         with self._mutex:
             self.conn.setGroupNameForSession(group)
+        # cached objects were looked up in the previous group context
+        self.invalidate_cache()
     
+    @retry_on_session_loss
     def get_default_omero_group(self) -> str:
         with self._mutex:
             group = self.conn.getGroupFromContext()
         return str(group.getName())
 
+    @retry_on_session_loss
     def get_user_project_ids(self, user_id):
-        projects = []
-        with self._mutex:
-           for p in self.conn.listProjects(user_id):         # Initially we just load Projects
-                projects.append((p.getName(),p.getId()))
-            
-        return projects
+        def load():
+            projects = []
+            with self._mutex:
+                for p in self.conn.listProjects(user_id):         # Initially we just load Projects
+                    projects.append((p.getName(),p.getId()))
+            return projects
+        return list(self._cached("project", ("ids", user_id), load))
     
+    @retry_on_session_loss
     def get_user_projects(self, user_id):
-        projects = []
-        with self._mutex:
-            for p in self.conn.listProjects(user_id):         # Initially we just load Projects
-                projects.append(p)
-            
-        return projects
+        def load():
+            projects = []
+            with self._mutex:
+                for p in self.conn.listProjects(user_id):         # Initially we just load Projects
+                    projects.append(p)
+            return projects
+        return list(self._cached("project", ("objects", user_id), load))
         
+    @retry_on_session_loss
     def get_dataset(self, dataSetId: int) -> DatasetWrapper | None:
-        return self._get_object("Dataset", dataSetId)
+        return self._cached("dataset", dataSetId, lambda: self._get_object("Dataset", dataSetId))
         
+    @retry_on_session_loss
     def get_image(self, imageID: int) -> ImageWrapper | None:
-        return self._get_object("Image", imageID)
+        return self._cached("image", imageID, lambda: self._get_object("Image", imageID))
     
+    def get_pixel_reader(self, image_id: int, level: int = 0, max_workers: int = 8, tile_cache_dir=None) -> TiledPixelReader:
+        """Tile reader for the primary pixels of an image, see TiledPixelReader."""
+        img = self._get_object("Image", image_id)
+        if img is None:
+            raise ValueError(f"image with id {image_id} does not exist")
+        return TiledPixelReader(self.conn, img, level=level, max_workers=max_workers, tile_cache_dir=tile_cache_dir)
+
+    def read_image_pixels(self, image_id: int, region: tuple[int, int, int, int] | None = None, level: int | None = None,
+                          z: int = 0, c: int = 0, t: int = 0, lazy: bool = False, max_workers: int = 8,
+                          tile_cache_dir=None):
+        """
+        Read one plane of an image, or region (x, y, width, height) of it, at pyramid
+        level (0/None is full resolution). Tiles are fetched in parallel over
+        max_workers raw pixel stores and assembled into a numpy array.
+        With lazy set, a dask array with one chunk per OMERO tile is returned
+        instead; it keeps its reader (and stores) alive until it is garbage collected.
+        """
+        reader = self.get_pixel_reader(image_id, level=level or 0, max_workers=max_workers, tile_cache_dir=tile_cache_dir)
+        if lazy:
+            return reader.to_dask(region, z=z, c=c, t=t)
+        with reader:
+            return reader.read_region(region, z=z, c=c, t=t)
+
     def _get_objects(self, obj_type, filters=None):
-         with self._mutex:
-            match filters:
-                case None:
-                    return self.conn.getObjects(obj_type)
-                case int() | str():
-                    return self.conn.getObjects(obj_type, filters)
-                case dict():
-                    return self.conn.getObjects(obj_type, attributes=filters)
-                case _:
-                    raise ValueError("Invalid filter type in OmeroConnection._get_objects")        
+        return self.iter_objects(obj_type, filters)
+
+    def iter_objects(self, obj_type, filters=None, page_size: int = DEFAULT_PAGE_SIZE, fields: list[str] | None = None,
+                     prefetch: bool = False):
+        """
+        Stream objects of obj_type page by page (server side offset/limit), so
+        memory stays flat and the first objects arrive after one round trip.
+        The lock is only held while a page is fetched, never while iterating.
+            filters: None, an id, or a dict of attribute values
+            fields: if given, yield dicts with only these fields (e.g. ["id", "name"])
+                    from a projection query instead of full object wrappers
+            prefetch: fetch the next page in the background while the current one is consumed
+        """
+        match filters:
+            case None | int() | str() | dict():
+                pass
+            case _:
+                raise ValueError("Invalid filter type in OmeroConnection.iter_objects")
+        if fields:
+            fetch_page = self._projection_page_fetcher(obj_type, filters, fields)
+        else:
+            fetch_page = self._wrapper_page_fetcher(obj_type, filters)
+        return iter_pages(fetch_page, page_size, prefetch)
+
+    def _wrapper_page_fetcher(self, obj_type, filters):
+        def fetch_page(offset, limit):
+            opts = {"offset": offset, "limit": limit, "order_by": "obj.id"}
+            with self._mutex:
+                match filters:
+                    case None:
+                        return list(self.conn.getObjects(obj_type, opts=opts))
+                    case int() | str():
+                        return list(self.conn.getObjects(obj_type, [filters], opts=opts))
+                    case dict():
+                        return list(self.conn.getObjects(obj_type, attributes=filters, opts=opts))
+        return fetch_page
+
+    def _projection_page_fetcher(self, obj_type, filters, fields):
+        query = f"select {', '.join('obj.' + f for f in fields)} from {obj_type} obj"
+        params = ParametersI()
+        clauses = []
+        match filters:
+            case int() | str():
+                clauses.append("obj.id = :id")
+                params.addId(int(filters))
+            case dict():
+                for i, (name, value) in enumerate(filters.items()):
+                    clauses.append(f"obj.{name} = :p{i}")
+                    params.add(f"p{i}", omero.rtypes.rtype(value))
+        if clauses:
+            query += " where " + " and ".join(clauses)
+        query += " order by obj.id"
+
+        def fetch_page(offset, limit):
+            params.page(offset, limit)
+            with self._mutex:
+                rows = self.conn.getQueryService().projection(query, params, self.conn.SERVICE_OPTS)
+            return [dict(zip(fields, (omero.rtypes.unwrap(v) for v in row))) for row in rows]
+        return fetch_page
 
     def _get_object(self, obj_type, filters=None):        
         with self._mutex:
@@ -135,7 +321,8 @@ class OmeroConnection:
             self.conn.getUpdateService().saveObject(link)
             dataset_id = dataset_id.getValue()
             logger.info(f"Created new dataset '{dataset_name}' with ID {dataset_id} and linked to project.")
-            
+
+        self.invalidate_cache("project")
         return dataset_id
 
     def create_project(self,project_name):
@@ -144,18 +331,88 @@ class OmeroConnection:
         project = self.conn.getUpdateService().saveAndReturnObject(p)
         logger.info(f"Created new project - ID: {project.getId().getValue()}, Name: {project_name}")
         project_id = project.getId().getValue()
+        self.invalidate_cache("project")
         return project_id
 
-    def create_and_link_local_attachment(self, attachment_file: str, image_id: int):
+    @retry_on_session_loss
+    def find_project(self, project_name: str) -> int | None:
+        """Id of the oldest project named project_name, or None."""
+        for p in self._get_objects("Project", {"name": project_name}):
+            return p.getId()
+        return None
+
+    @retry_on_session_loss
+    def find_dataset(self, project_id: int, dataset_name: str) -> int | None:
+        """Id of the oldest dataset named dataset_name in the project, or None."""
+        with self._mutex:
+            return oldest_id_by_name(self.conn.getObjects("Dataset", opts={"project": project_id}), dataset_name)
+
+    def get_or_create_project(self, project_name: str) -> int:
+        """Id of the project named project_name, created if there is none. Duplicates resolve to the oldest."""
+        return _get_or_create((self.hostname, "project", project_name), lambda: self.find_project(project_name),
+                              lambda: self.create_project(project_name))
+
+    def get_or_create_dataset(self, project_id: int, dataset_name: str) -> int:
+        """Id of the dataset named dataset_name in the project, created if there is none."""
+        return _get_or_create((self.hostname, "dataset", project_id, dataset_name),
+                              lambda: self.find_dataset(project_id, dataset_name),
+                              lambda: self.create_dataset(project_id, dataset_name))
+
+    @retry_on_session_loss
+    def get_dataset_file_hashes(self, dataset_id: int) -> set[str]:
+        """Checksums of the original files imported into the images of a dataset."""
+        query = ("select distinct fe.originalFile.hash from FilesetEntry fe join fe.fileset fs "
+                 "join fs.images i join i.datasetLinks dl where dl.parent.id = :did")
+        params = ParametersI()
+        params.addLong("did", dataset_id)
+        with self._mutex:
+            rows = self.conn.getQueryService().projection(query, params, self.conn.SERVICE_OPTS)
+        return {row[0].getValue() for row in rows if row and row[0] is not None}
+
+    @retry_on_session_loss
+    def get_images_metadata(self, image_ids, chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE) -> dict[str, list]:
+        """
+        Key metadata and annotations of many images, fetched with a few projection
+        queries per chunk of ids instead of several round trips per image.
+        See CCIOmeroQuery.images_metadata for the columns.
+        """
+        def projection(query, ids):
+            params = ParametersI()
+            params.addIds(ids)
+            with self._mutex:
+                rows = self.conn.getQueryService().projection(query, params, self.conn.SERVICE_OPTS)
+            return [[omero.rtypes.unwrap(v) for v in row] for row in rows]
+        return images_metadata(projection, image_ids, chunk_size)
+
+    @retry_on_session_loss
+    def get_dataset_metadata(self, dataset_id: int, chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE) -> dict[str, list]:
+        """get_images_metadata for all images of a dataset, ordered by image id."""
+        query = "select l.child.id from DatasetImageLink l where l.parent.id = :did order by l.child.id"
+        params = ParametersI()
+        params.addLong("did", dataset_id)
+        with self._mutex:
+            rows = self.conn.getQueryService().projection(query, params, self.conn.SERVICE_OPTS)
+        return self.get_images_metadata([row[0].getValue() for row in rows], chunk_size=chunk_size)
+
+    def upload(self, paths, project_name: str, dataset_name: str, max_workers: int = 4, max_retries: int = 3,
+               dedupe: bool = True) -> UploadReport:
+        """Import files or OME-Zarr folders into project/dataset concurrently, see OmeroUploader."""
+        uploader = OmeroUploader(self, max_workers=max_workers, max_retries=max_retries)
+        return uploader.upload(paths, project_name, dataset_name, dedupe=dedupe)
+
+    def create_and_link_local_attachment(self, attachment_file: str, image_id: int, mimetype: str | None = None,
+                                         desc: str = "Optional description"):
         img = self._get_object("Image",image_id)
         if img is None:
             logger.error(f"image with id {image_id} does not exist. No link created")
             return False
         
+        if mimetype is None:
+            mimetype = mimetypes.guess_type(attachment_file)[0] or "application/octet-stream"
         file_ann = self.conn.createFileAnnfromLocalFile(
                     attachment_file,
-                    mimetype="text/plain",  # Adjust as needed
-                    desc="Optional description"
+                    mimetype=mimetype,
+                    desc=desc
                 )
         img.linkAnnotation(file_ann)
         return True
@@ -184,10 +441,107 @@ class OmeroConnection:
         with self._mutex:
             image.setDescription(descr)
             image.save()
+        if self._cache is not None:
+            self._cache.invalidate("image", image.getId())
 
     def set_comment_on_image(self, image, comment):
         with self._mutex:
             comment_ann = CommentAnnotationWrapper(self.conn) # pyright: ignore[reportAttributeAccessIssue]
             comment_ann.setValue(comment)
             comment_ann.save()
-            image.linkAnnotation(comment_ann)
\ No newline at end of file
+            image.linkAnnotation(comment_ann)
+
+    def link_tags(self, image_ids, tags, chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE) -> BatchResult:
+        """
+        Link every tag to every image.
+        tags are tag values (str), a new tag annotation is created for each,
+        or ids (any integer type, e.g. numpy integers) of existing tag annotations.
+        Result keys are (image_id, tag) pairs.
+        Raises TypeError for any other tag, before anything is saved.
+        """
+        tags = check_tags(tags)
+        new_values = [t for t in tags if isinstance(t, str)]
+        new_tags = []
+        for value in new_values:
+            tag_ann = omero.model.TagAnnotationI() # pyright: ignore[reportAttributeAccessIssue]
+            tag_ann.setTextValue(omero.rtypes.rstring(value))
+            new_tags.append(tag_ann)
+        logger.info(f"Creating {len(new_tags)} tags")
+        tag_result = BatchResult()
+        saved_tags = self._save_in_chunks(new_tags, new_values, chunk_size, tag_result)
+        tag_ids = dict(zip(new_values, [t.getId().getValue() if t is not None else None for t in saved_tags]))
+
+        result = BatchResult()
+        links, keys = [], []
+        for image_id in image_ids:
+            for tag in tags:
+                tag_id = tag_ids[tag] if isinstance(tag, str) else int(tag)
+                if tag_id is None:
+                    result.failed[(image_id, tag)] = tag_result.failed[tag]
+                    continue
+                link = omero.model.ImageAnnotationLinkI() # pyright: ignore[reportAttributeAccessIssue]
+                link.setParent(omero.model.ImageI(image_id, False)) # pyright: ignore[reportAttributeAccessIssue]
+                link.setChild(omero.model.TagAnnotationI(tag_id, False)) # pyright: ignore[reportAttributeAccessIssue]
+                links.append(link)
+                keys.append((image_id, tag))
+
+        logger.info(f"Linking {len(links)} tag annotations")
+        self._save_in_chunks(links, keys, chunk_size, result, return_objects=False)
+        return result
+
+    def set_descriptions(self, descriptions: dict[int, str], chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE) -> BatchResult:
+        """Set the description of many images, descriptions maps image id -> text."""
+        result = BatchResult()
+        query = "select i from Image i where i.id in (:ids)"
+        for id_chunk in chunks(list(descriptions), chunk_size):
+            with self._mutex:
+                try:
+                    images = self.conn.getQueryService().findAllByQuery(
+                        query, ParametersI().addIds(id_chunk), self.conn.SERVICE_OPTS)
+                except Exception as e:
+                    logger.error(f"Failed to load images for description update: {str(e)}")
+                    result.failed.update({image_id: str(e) for image_id in id_chunk})
+                    continue
+
+            found = {img.getId().getValue(): img for img in images}
+            for image_id in id_chunk:
+                if image_id not in found:
+                    result.failed[image_id] = "image not found"
+            for image_id, img in found.items():
+                img.setDescription(omero.rtypes.rstring(descriptions[image_id]))
+            self._save_in_chunks(list(found.values()), list(found), chunk_size, result, return_objects=False)
+        if self._cache is not None:
+            for image_id in result.succeeded:
+                self._cache.invalidate("image", image_id)
+        return result
+
+    def add_comments(self, comments: dict[int, str], chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE) -> BatchResult:
+        """Create one comment annotation per image and link it, comments maps image id -> text."""
+        image_ids = list(comments)
+        anns = []
+        for image_id in image_ids:
+            comment_ann = omero.model.CommentAnnotationI() # pyright: ignore[reportAttributeAccessIssue]
+            comment_ann.setTextValue(omero.rtypes.rstring(comments[image_id]))
+            anns.append(comment_ann)
+
+        ann_result = BatchResult()
+        saved = self._save_in_chunks(anns, image_ids, chunk_size, ann_result)
+
+        result = BatchResult()
+        result.failed.update(ann_result.failed)
+        links, keys = [], []
+        for image_id, ann in zip(image_ids, saved):
+            if ann is None:
+                continue
+            link = omero.model.ImageAnnotationLinkI() # pyright: ignore[reportAttributeAccessIssue]
+            link.setParent(omero.model.ImageI(image_id, False)) # pyright: ignore[reportAttributeAccessIssue]
+            link.setChild(omero.model.CommentAnnotationI(ann.getId().getValue(), False)) # pyright: ignore[reportAttributeAccessIssue]
+            links.append(link)
+            keys.append(image_id)
+        self._save_in_chunks(links, keys, chunk_size, result, return_objects=False)
+        return result
+
+    def _save_in_chunks(self, objects: list, keys: list, chunk_size: int, result: BatchResult, return_objects: bool = True) -> list:
+        """save_in_chunks with this connection's update service, see CCIOmeroBatch."""
+        return save_in_chunks(self.conn.getUpdateService(), objects, keys, chunk_size, result, lock=self._mutex,
+                              service_opts=self.conn.SERVICE_OPTS, return_objects=return_objects)
@@ -0,0 +1,159 @@
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+def _default_connection_factory(hostname: str, port: str, session_key: str):
+    # imported here so the pool can be used (and tested) without omero installed
+    from ccipy.omero.CCIOmeroConnection import OmeroConnection
+    return OmeroConnection(hostname, port, session_key)
+
+
+class _PooledEntry:
+    __slots__ = ("conn", "last_checked")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.last_checked = time.monotonic()
+
+
+class OmeroConnectionPool:
+    """
+    A bounded pool of OmeroConnections that all join the same OMERO session key.
+    Every connection has its own BlitzGateway, so calls made through different
+    checked out connections run in parallel instead of queuing on one lock.
+
+    Connections are created on demand up to max_size. Idle connections older
+    than health_check_interval seconds are checked with is_alive() before being
+    handed out and replaced if dead.
+    connection_factory(hostname, port, session_key) creates the connections,
+    it defaults to OmeroConnection and can be swapped for a fake in tests.
+    """
+
+    def __init__(self, hostname: str, port: str, session_key: str, max_size: int = 4,
+                 connection_factory: Callable | None = None, health_check_interval: float = 30.0):
+        if max_size < 1:
+            raise ValueError("OmeroConnectionPool max_size must be at least 1")
+        self.hostname = hostname
+        self.port = port
+        self.session_key = session_key
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self._factory = connection_factory or _default_connection_factory
+
+        self._idle: deque[_PooledEntry] = deque()
+        self._created = 0
+        self._closed = False
+        self._cond = Condition()
+
+    @property
+    def size(self) -> int:
+        """Number of open connections, idle or checked out."""
+        return self._created
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def acquire(self, timeout: float | None = None):
+        """
+        Check out a connection, waiting up to timeout seconds (None waits forever)
+        when max_size connections are already in use.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                entry = None
+                while entry is None:
+                    if self._closed:
+                        raise RuntimeError("OmeroConnectionPool is closed")
+                    if self._idle:
+                        entry = self._idle.pop()
+                    elif self._created < self.max_size:
+                        self._created += 1
+                        break
+                    else:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            raise TimeoutError(f"No OMERO connection available within {timeout} s")
+                        self._cond.wait(remaining)
+
+            if entry is None:
+                return self._create()
+
+            if time.monotonic() - entry.last_checked < self.health_check_interval or self._is_alive(entry.conn):
+                return entry.conn
+
+            logger.warning("Discarding dead pooled OMERO connection")
+            self._discard(entry.conn)
+
+    def release(self, conn, discard: bool = False):
+        """Return a checked out connection, discard drops it instead (e.g. after a connection error)."""
+        if discard or self._closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append(_PooledEntry(conn))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator:
+        """Context manager checking a connection out and back in."""
+        conn = self.acquire(timeout)
+        failed = False
+        try:
+            yield conn
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            # also runs on KeyboardInterrupt and when the context manager is abandoned (GeneratorExit);
+            # after an error the connection may be in a bad state, the health check decides
+            self.release(conn, discard=failed and not self._is_alive(conn))
+
+    def close(self):
+        """Close idle connections, connections still checked out are closed on release."""
+        with self._cond:
+            self._closed = True
+            idle = [e.conn for e in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def _create(self):
+        try:
+            return self._factory(self.hostname, self.port, self.session_key)
+        except BaseException:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def _discard(self, conn):
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+        try:
+            # only detach, the session is shared with the other connections
+            conn.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled OMERO connection: {str(e)}")
+
+    @staticmethod
+    def _is_alive(conn) -> bool:
+        try:
+            return conn.is_alive()
+        except Exception:
+            return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
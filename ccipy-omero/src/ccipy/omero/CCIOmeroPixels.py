@@ -0,0 +1,182 @@
+import os
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# OMERO pixel type -> dtype of the big endian bytes returned by RawPixelsStore
+PIXEL_TYPES = {
+    "int8": np.dtype("i1"),
+    "uint8": np.dtype("u1"),
+    "int16": np.dtype(">i2"),
+    "uint16": np.dtype(">u2"),
+    "int32": np.dtype(">i4"),
+    "uint32": np.dtype(">u4"),
+    "float": np.dtype(">f4"),
+    "double": np.dtype(">f8"),
+}
+
+
+class TiledPixelReader:
+    """
+    Reads the pixels of one image tile by tile from OMERO.
+    Tiles are fetched in parallel, each worker uses its own RawPixelsStore
+    from a small pool, since a store holds per call state (pixels id, level).
+    level 0 is full resolution, higher levels are the downsampled pyramid levels.
+    tile_cache_dir optionally keeps fetched tiles on disk as .npy files.
+    Call close() (or use as a context manager) to release the stores.
+    """
+
+    def __init__(self, conn, image, level: int = 0, max_workers: int = 8, tile_cache_dir: str | Path | None = None):
+        self._conn = conn
+        self.image_id = image.getId()
+        pixels = image.getPrimaryPixels()
+        self.pixels_id = pixels.getId()
+        pixel_type = pixels.getPixelsType().getValue()
+        if pixel_type not in PIXEL_TYPES:
+            raise ValueError(f"Unsupported OMERO pixel type: {pixel_type}")
+        self.dtype = PIXEL_TYPES[pixel_type]
+        self.level = level
+        self.max_workers = max_workers
+        self.tile_cache_dir = Path(tile_cache_dir) if tile_cache_dir is not None else None
+
+        self._stores: queue.LifoQueue = queue.LifoQueue()
+        self._all_stores: list = []
+        self._stores_lock = threading.Lock()
+        self._closed = False
+
+        store = self._conn.c.sf.createRawPixelsStore()
+        self._all_stores.append(store)
+        store.setPixelsId(self.pixels_id, True, self._conn.SERVICE_OPTS)
+        self.n_levels = store.getResolutionLevels()
+        if not 0 <= level < self.n_levels:
+            raise ValueError(f"Image {self.image_id} has {self.n_levels} resolution levels, got level {level}")
+        if self.n_levels > 1:
+            # descriptions are ordered from full resolution down
+            desc = store.getResolutionDescriptions()[level]
+            self.size_x, self.size_y = desc.sizeX, desc.sizeY
+        else:
+            self.size_x, self.size_y = pixels.getSizeX(), pixels.getSizeY()
+        self._set_level(store)
+        self.tile_width, self.tile_height = store.getTileSize()
+        self._release_store(store)
+
+    def _set_level(self, store):
+        # RawPixelsStore counts levels from the smallest one
+        store.setResolutionLevel(self.n_levels - 1 - self.level)
+
+    def _acquire_store(self):
+        try:
+            return self._stores.get_nowait()
+        except queue.Empty:
+            pass
+        with self._stores_lock:
+            if self._closed:
+                raise RuntimeError("TiledPixelReader is closed")
+            if len(self._all_stores) >= self.max_workers:
+                store = None
+            else:
+                store = self._conn.c.sf.createRawPixelsStore()
+                self._all_stores.append(store)
+        if store is None:
+            return self._stores.get()
+        store.setPixelsId(self.pixels_id, True, self._conn.SERVICE_OPTS)
+        self._set_level(store)
+        return store
+
+    def _release_store(self, store):
+        self._stores.put(store)
+
+    def _tile_cache_path(self, z, c, t, x, y, w, h) -> Path | None:
+        if self.tile_cache_dir is None:
+            return None
+        return self.tile_cache_dir / str(self.image_id) / f"L{self.level}" / f"z{z}_c{c}_t{t}_x{x}_y{y}_{w}x{h}.npy"
+
+    def read_tile(self, z: int, c: int, t: int, x: int, y: int, w: int, h: int) -> np.ndarray:
+        cache_path = self._tile_cache_path(z, c, t, x, y, w, h)
+        if cache_path is not None and cache_path.exists():
+            return np.load(cache_path)
+
+        store = self._acquire_store()
+        try:
+            data = store.getTile(z, c, t, x, y, w, h, self._conn.SERVICE_OPTS)
+        finally:
+            self._release_store(store)
+        tile = np.frombuffer(data, dtype=self.dtype).reshape(h, w).astype(self.dtype.newbyteorder("="))
+
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(suffix=".npy", dir=cache_path.parent)
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, tile)
+            os.replace(tmp_name, cache_path)
+        return tile
+
+    def tile_grid(self, region: tuple[int, int, int, int] | None = None) -> list[list[tuple[int, int, int, int]]]:
+        """
+        Split region (x, y, width, height; default the whole plane) along the
+        OMERO tile grid. Returns rows of (x, y, w, h) tiles.
+        """
+        x0, y0, width, height = region if region is not None else (0, 0, self.size_x, self.size_y)
+        if x0 < 0 or y0 < 0 or width <= 0 or height <= 0 or x0 + width > self.size_x or y0 + height > self.size_y:
+            raise ValueError(f"Region {region} outside of image of size {self.size_x}x{self.size_y}")
+
+        def splits(start, length, step):
+            edges = [start] + list(range((start // step + 1) * step, start + length, step)) + [start + length]
+            return [(a, b - a) for a, b in zip(edges[:-1], edges[1:])]
+
+        return [[(x, y, w, h) for x, w in splits(x0, width, self.tile_width)]
+                for y, h in splits(y0, height, self.tile_height)]
+
+    def read_region(self, region: tuple[int, int, int, int] | None = None, z: int = 0, c: int = 0, t: int = 0) -> np.ndarray:
+        """Fetch region (x, y, width, height) of one plane in parallel into a numpy array."""
+        grid = self.tile_grid(region)
+        x0, y0 = grid[0][0][:2]
+        height = sum(row[0][3] for row in grid)
+        width = sum(tile[2] for tile in grid[0])
+        out = np.empty((height, width), dtype=self.dtype.newbyteorder("="))
+
+        def fetch(tile):
+            x, y, w, h = tile
+            out[y - y0:y - y0 + h, x - x0:x - x0 + w] = self.read_tile(z, c, t, x, y, w, h)
+
+        tiles = [tile for row in grid for tile in row]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # list() re-raises the first failure
+            list(pool.map(fetch, tiles))
+        return out
+
+    def to_dask(self, region: tuple[int, int, int, int] | None = None, z: int = 0, c: int = 0, t: int = 0):
+        """Lazy dask array over region of one plane, with one chunk per OMERO tile."""
+        import dask
+        import dask.array as da
+
+        dtype = self.dtype.newbyteorder("=")
+        read_tile = dask.delayed(self.read_tile, pure=True)
+        blocks = [[da.from_delayed(read_tile(z, c, t, x, y, w, h), shape=(h, w), dtype=dtype) for x, y, w, h in row]
+                  for row in self.tile_grid(region)]
+        return da.block(blocks)
+
+    def close(self):
+        if not hasattr(self, "_stores_lock"):
+            return
+        with self._stores_lock:
+            self._closed = True
+            stores, self._all_stores = self._all_stores, []
+        for store in stores:
+            try:
+                store.close()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
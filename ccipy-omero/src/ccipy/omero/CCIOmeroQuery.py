@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, Iterable
+
+from ccipy.omero.CCIOmeroBatch import chunks
+
+IMAGE_COLUMNS = ("id", "name", "description", "acquisition_date", "size_x", "size_y", "size_z", "size_c", "size_t",
+                 "pixel_type")
+
+_IMAGE_QUERY = ("select i.id, i.name, i.description, i.acquisitionDate, p.sizeX, p.sizeY, p.sizeZ, p.sizeC, "
+                "p.sizeT, pt.value from Image i left outer join i.pixels p left outer join p.pixelsType pt "
+                "where i.id in (:ids)")
+_LINK_QUERY = ("select l.parent.id, a.id, {value} from ImageAnnotationLink l, {ann_class} a {join}"
+               "where a.id = l.child.id and l.parent.id in (:ids) order by l.id")
+TAG_QUERY = _LINK_QUERY.format(value="a.textValue", ann_class="TagAnnotation", join="")
+COMMENT_QUERY = _LINK_QUERY.format(value="a.textValue", ann_class="CommentAnnotation", join="")
+FILE_QUERY = _LINK_QUERY.format(value="f.name", ann_class="FileAnnotation", join="join a.file f ")
+
+
+def iter_pages(fetch_page: Callable[[int, int], list], page_size: int, prefetch: bool = False):
+    """
+    Yield the items of fetch_page(offset, limit) page by page until a page is
+    shorter than page_size. With prefetch set, the next page is fetched on a
+    background thread while the current one is consumed.
+    """
+    offset = 0
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = fetch_page(offset, page_size)
+        while page:
+            next_page = None
+            if executor is not None and len(page) == page_size:
+                next_page = executor.submit(fetch_page, offset + page_size, page_size)
+            yield from page
+            if len(page) < page_size:
+                break
+            offset += page_size
+            page = next_page.result() if next_page is not None else fetch_page(offset, page_size)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def oldest_id_by_name(objects: Iterable, name: str) -> int | None:
+    """Lowest id of the wrappers named name, so duplicate names always resolve to the same object."""
+    return min((obj.getId() for obj in objects if obj.getName() == name), default=None)
+
+
+class GetOrCreate:
+    """
+    Serializes get-or-create calls per key, so threads asking for the same
+    project or dataset at once create it a single time instead of each
+    creating a duplicate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+
+    def __call__(self, key: Hashable, find: Callable[[], int | None], create: Callable[[], int]) -> int:
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            found = find()
+            return found if found is not None else create()
+
+
+def images_metadata(projection: Callable[[str, list[int]], list], image_ids, chunk_size: int) -> dict[str, list]:
+    """
+    Metadata and annotations of many images with four projection queries per chunk of ids.
+    projection(query, ids) runs an HQL query with the :ids parameter and returns
+    its rows as lists of plain (unwrapped) values.
+    Returns columns of equal length, one row per existing image in image_ids order:
+        id, name, description, acquisition_date (ms since epoch), size_x, size_y,
+        size_z, size_c, size_t, pixel_type,
+        tags, comments (lists of strings), files (lists of (annotation id, file name))
+    """
+    rows = {}
+    tags, comments, files = {}, {}, {}
+    image_ids = [int(i) for i in image_ids]
+    for chunk in chunks(list(dict.fromkeys(image_ids)), chunk_size):
+        for row in projection(_IMAGE_QUERY, chunk):
+            # images with several pixels sets keep the first one
+            rows.setdefault(row[0], row)
+        for target, query in ((tags, TAG_QUERY), (comments, COMMENT_QUERY), (files, FILE_QUERY)):
+            for image_id, ann_id, value in projection(query, chunk):
+                target.setdefault(image_id, []).append((ann_id, value))
+
+    found = [i for i in image_ids if i in rows]
+    result = {name: [rows[i][n] for i in found] for n, name in enumerate(IMAGE_COLUMNS)}
+    result["tags"] = [[v for _, v in tags.get(i, [])] for i in found]
+    result["comments"] = [[v for _, v in comments.get(i, [])] for i in found]
+    result["files"] = [files.get(i, []) for i in found]
+    return result
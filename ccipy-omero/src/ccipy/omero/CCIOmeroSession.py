@@ -0,0 +1,131 @@
+import functools
+import logging
+import threading
+import time
+import weakref
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def retry_on_session_loss(method):
+    """
+    Reconnect and retry once when an idempotent call fails because the
+    connection dropped. If the session itself expired, the call is retried
+    on a new session from session_factory, or the error is raised as is.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        generation = self._conn_generation
+        try:
+            return method(self, *args, **kwargs)
+        except self.TRANSPORT_ERRORS as e:
+            logger.warning(f"OMERO connection lost in {method.__name__} ({type(e).__name__}), reconnecting")
+            self._reconnect(generation)
+        except self.SESSION_EXPIRED_ERRORS as e:
+            # rejoining the same session key cannot succeed anymore
+            if self.session_factory is None:
+                raise
+            logger.warning(f"OMERO session expired in {method.__name__} ({type(e).__name__}), opening a new one")
+            self._reconnect(generation, new_session=True)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _keepalive_loop(conn_ref: weakref.ref, stop: threading.Event, interval: float):
+    # holds only a weak reference so the connection can still be garbage collected
+    while not stop.wait(interval):
+        conn = conn_ref()
+        if conn is None:
+            return
+        try:
+            conn._keep_session_alive()
+        except Exception as e:
+            logger.error(f"OMERO keepalive could not reconnect: {str(e)}")
+        del conn
+
+
+class ReconnectingSession:
+    """
+    Reconnect and keepalive handling of OmeroConnection, kept free of omero imports.
+    Subclasses set TRANSPORT_ERRORS (the connection dropped, the session can be
+    rejoined) and SESSION_EXPIRED_ERRORS (the session is gone on the server), and
+    provide hostname, port, omero_token, conn, _mutex, _connect_to_omero(hostname, port, token),
+    is_alive() and invalidate_cache().
+    session_factory, if set, returns the key of a new session (e.g. by logging in
+    again) and is used once the old session has expired.
+    """
+    TRANSPORT_ERRORS: tuple = ()
+    SESSION_EXPIRED_ERRORS: tuple = ()
+
+    def _init_session_recovery(self, max_reconnect_attempts: int, session_factory: Callable[[], str] | None):
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.session_factory = session_factory
+        # seconds the last (re)connect took and number of reconnects, see connection_stats()
+        self.session_setup_seconds = 0.0
+        self.reconnects = 0
+        self._reconnect_lock = threading.Lock()
+        self._conn_generation = 0
+        self._keepalive_stop = threading.Event()
+        self._keepalive_thread: threading.Thread | None = None
+
+    def _start_keepalive(self, interval: float):
+        self._keepalive_thread = threading.Thread(target=_keepalive_loop, name="omero-keepalive", daemon=True,
+                                                  args=(weakref.ref(self), self._keepalive_stop, interval))
+        self._keepalive_thread.start()
+
+    def _stop_keepalive(self):
+        self._keepalive_stop.set()
+        thread = self._keepalive_thread
+        # the connection may be garbage collected on the keepalive thread itself
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def _keep_session_alive(self):
+        """Ping the session and reconnect if it is gone, a new session is opened if rejoining fails."""
+        generation = self._conn_generation
+        if self.is_alive():
+            return
+        logger.warning("OMERO keepalive failed, reconnecting")
+        try:
+            self._reconnect(generation)
+        except ConnectionError:
+            if self.session_factory is None:
+                raise
+            self._reconnect(generation, new_session=True)
+
+    def _reconnect(self, seen_generation: int, new_session: bool = False):
+        """
+        Rejoin the session after the connection was lost, or open a new session
+        from session_factory. Threads that saw the same broken connection
+        (seen_generation) reconnect only once between them.
+        """
+        with self._reconnect_lock:
+            if self._conn_generation != seen_generation:
+                return
+            last_error = None
+            for attempt in range(self.max_reconnect_attempts):
+                if attempt:
+                    time.sleep(min(2 ** (attempt - 1), 10))
+                with self._mutex:
+                    try:
+                        self.conn.close(hard=False)
+                    except Exception:
+                        pass
+                    try:
+                        token = self.session_factory() if new_session else self.omero_token
+                        self._connect_to_omero(self.hostname, self.port, token)
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"OMERO reconnect attempt {attempt + 1} failed: {str(e)}")
+                        continue
+                    self._conn_generation += 1
+                    self.reconnects += 1
+                # wrappers in the cache belong to the old connection
+                self.invalidate_cache()
+                return
+            raise ConnectionError(f"Could not reconnect to OMERO after {self.max_reconnect_attempts} attempts") from last_error
+
+    def connection_stats(self) -> dict[str, float]:
+        """Latency of the last session setup and number of reconnects so far."""
+        return {"session_setup_seconds": self.session_setup_seconds, "reconnects": self.reconnects}
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_checksum(path: str | Path) -> str:
+    """
+    SHA1 of a file, the algorithm OMERO uses for imported files by default.
+    Directories such as OME-Zarr outputs get a SHA1 over their relative file
+    names and file checksums, which is only comparable with other local uploads.
+    """
+    path = Path(path)
+    if path.is_dir():
+        h = hashlib.sha1()
+        for sub in sorted(p for p in path.rglob("*") if p.is_file()):
+            h.update(sub.relative_to(path).as_posix().encode("utf-8"))
+            h.update(file_checksum(sub).encode("ascii"))
+        return h.hexdigest()
+
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def path_size(path: str | Path) -> int:
+    path = Path(path)
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return path.stat().st_size
+
+
+def cli_import(hostname: str, port: str, session_key: str, dataset_id: int, path: Path,
+               omero_command: str | None = None) -> list[int]:
+    """
+    Import path into a dataset with the omero CLI, joined to an existing session.
+    OME-Zarr folders need a server with the OMEZarrReader. Returns the new image ids.
+    """
+    omero_command = omero_command or shutil.which("omero")
+    if omero_command is None:
+        raise FileNotFoundError("The omero command line client was not found on PATH")
+    cmd = [omero_command, "import", "-s", hostname, "-p", str(port), "-k", session_key,
+           "-d", str(dataset_id), "--no-upgrade-check", str(path)]
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    if res.returncode != 0:
+        raise RuntimeError(f"omero import of {path} failed: {res.stderr.strip()[-500:]}")
+    # the CLI prints e.g. "Image:101,102" on stdout
+    ids = []
+    for match in re.finditer(r"Image:([\d,]+)", res.stdout):
+        ids.extend(int(i) for i in match.group(1).split(","))
+    return ids
+
+
+class UploadReport:
+    """Outcome and throughput of an OmeroUploader.upload call"""
+    def __init__(self):
+        self.image_ids: dict[str, list[int]] = {}
+        self.skipped: list[str] = []
+        self.failed: dict[str, str] = {}
+        self.bytes_uploaded = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput_mb_s(self) -> float:
+        return self.bytes_uploaded / 2**20 / self.seconds if self.seconds > 0 else 0.0
+
+    def __repr__(self):
+        return (f"UploadReport(uploaded={len(self.image_ids)}, skipped={len(self.skipped)}, "
+                f"failed={len(self.failed)}, {self.bytes_uploaded / 2**20:.1f} MB at {self.throughput_mb_s:.1f} MB/s)")
+
+
+class OmeroUploader:
+    """
+    Uploads local files or OME-Zarr folders into an OMERO dataset.
+    The project and dataset are resolved (or created) once, then up to
+    max_workers imports run concurrently. Failed imports are retried
+    max_retries times with exponential backoff starting at backoff_s.
+    With dedupe set, files whose checksum is already in the dataset, or
+    repeated in the same batch, are skipped.
+    import_fn(dataset_id, path) -> image ids does the actual import and
+    defaults to the omero CLI joined to the connection's session.
+    """
+
+    def __init__(self, conn, max_workers: int = 4, max_retries: int = 3, backoff_s: float = 2.0,
+                 import_fn: Callable[[int, Path], list[int]] | None = None):
+        self.conn = conn
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self._import_fn = import_fn or self._cli_import
+
+    def _cli_import(self, dataset_id: int, path: Path) -> list[int]:
+        return cli_import(self.conn.hostname, self.conn.port, self.conn.omero_token, dataset_id, path)
+
+    def upload(self, paths: Iterable[str | Path], project_name: str, dataset_name: str,
+               dedupe: bool = True) -> UploadReport:
+        report = UploadReport()
+        start = time.perf_counter()
+
+        project_id = self.conn.get_or_create_project(project_name)
+        dataset_id = self.conn.get_or_create_dataset(project_id, dataset_name)
+
+        paths = [Path(p) for p in paths]
+        if dedupe:
+            paths = self._dedupe(paths, dataset_id, report)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="omero-upload") as pool:
+            futures = {pool.submit(self._import_with_retry, dataset_id, p): p for p in paths}
+            for future in as_completed(futures):
+                p = futures[future]
+                try:
+                    report.image_ids[str(p)] = future.result()
+                    report.bytes_uploaded += path_size(p)
+                except Exception as e:
+                    logger.error(f"Upload of {p} failed: {str(e)}")
+                    report.failed[str(p)] = str(e)
+
+        report.seconds = time.perf_counter() - start
+        logger.info(f"Uploaded to dataset {dataset_id}: {report}")
+        return report
+
+    def _dedupe(self, paths: list[Path], dataset_id: int, report: UploadReport) -> list[Path]:
+        seen = self.conn.get_dataset_file_hashes(dataset_id)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(file_checksum, p) for p in paths]
+        unique = []
+        for p, future in zip(paths, futures):
+            try:
+                checksum = future.result()
+            except OSError as e:
+                # unreadable or vanished files fail alone, like failed imports
+                logger.error(f"Checksum of {p} failed: {str(e)}")
+                report.failed[str(p)] = str(e)
+                continue
+            if checksum in seen:
+                report.skipped.append(str(p))
+                continue
+            seen.add(checksum)
+            unique.append(p)
+        return unique
+
+    def _import_with_retry(self, dataset_id: int, path: Path) -> list[int]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._import_fn(dataset_id, path)
+            except FileNotFoundError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_s * 2**attempt
+                logger.warning(f"Import of {path} failed ({str(e)}), retrying in {delay:.1f} s")
+                time.sleep(delay)
+        return []  # not reached
+
@@ -5,3 +5,28 @@
 # def connect(host: str, user: str, password: str) -> Dict[str, str | bool]:
 #     # Placeholder for real OMERO connect; keep simple for CI
 #     return {"host": host, "user": user, "connected": True}
+
+# omero and Ice are slow to import, the classes are imported on first access
+_LAZY_ATTRIBUTES = {
+    "OmeroConnection": "ccipy.omero.CCIOmeroConnection",
+    "BatchResult": "ccipy.omero.CCIOmeroBatch",
+    "OmeroConnectionPool": "ccipy.omero.CCIOmeroConnectionPool",
+    "AsyncOmeroConnection": "ccipy.omero.CCIAsyncOmeroConnection",
+    "TTLCache": "ccipy.omero.CCIOmeroCache",
+    "TiledPixelReader": "ccipy.omero.CCIOmeroPixels",
+    "OmeroUploader": "ccipy.omero.CCIOmeroUpload",
+    "UploadReport": "ccipy.omero.CCIOmeroUpload",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
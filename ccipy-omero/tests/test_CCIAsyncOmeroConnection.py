@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+
+from ccipy.omero.CCIAsyncOmeroConnection import AsyncOmeroConnection
+from ccipy.omero.CCIOmeroConnectionPool import OmeroConnectionPool
+
+
+class FakeConnection:
+    """Stands in for OmeroConnection with a slow blocking get_image"""
+    active = 0
+    max_active = 0
+    calls = 0
+    lock = threading.Lock()
+
+    def __init__(self, hostname, port, session_key):
+        pass
+
+    def is_alive(self):
+        return True
+
+    def close(self):
+        pass
+
+    def get_image(self, image_id):
+        with FakeConnection.lock:
+            FakeConnection.calls += 1
+            FakeConnection.active += 1
+            FakeConnection.max_active = max(FakeConnection.max_active, FakeConnection.active)
+        time.sleep(0.05)
+        with FakeConnection.lock:
+            FakeConnection.active -= 1
+        return f"image {image_id}"
+
+    def create_and_link_local_attachment(self, attachment_file, image_id, mimetype=None, desc="Optional description"):
+        return attachment_file, image_id, mimetype, desc
+
+
+def make_connection(max_concurrency):
+    FakeConnection.active = FakeConnection.max_active = FakeConnection.calls = 0
+    pool = OmeroConnectionPool("host", "4064", "key", max_size=4, connection_factory=FakeConnection)
+    return AsyncOmeroConnection(pool, max_concurrency=max_concurrency)
+
+
+def test_concurrent_calls_are_bounded():
+    async def main():
+        async with make_connection(max_concurrency=3) as conn:
+            return await asyncio.gather(*(conn.get_image(i) for i in range(9)))
+
+    images = asyncio.run(main())
+    assert images == [f"image {i}" for i in range(9)]
+    assert FakeConnection.max_active == 3
+
+
+def test_cancelled_calls_are_skipped():
+    async def main():
+        async with make_connection(max_concurrency=1) as conn:
+            tasks = [asyncio.create_task(conn.get_image(i)) for i in range(5)]
+            await asyncio.sleep(0.01)
+            for t in tasks[1:]:
+                t.cancel()
+            assert await tasks[0] == "image 0"
+            await asyncio.gather(*tasks[1:], return_exceptions=True)
+
+    asyncio.run(main())
+    assert FakeConnection.calls == 1
+
+
+def test_attachment_options_are_forwarded():
+    async def main():
+        async with make_connection(max_concurrency=1) as conn:
+            return await conn.create_and_link_local_attachment("a.csv", 7, "text/csv", desc="table")
+
+    assert asyncio.run(main()) == ("a.csv", 7, "text/csv", "table")
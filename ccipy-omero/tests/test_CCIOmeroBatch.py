@@ -0,0 +1,59 @@
+import threading
+
+import numpy as np
+import pytest
+
+from ccipy.omero.CCIOmeroBatch import BatchResult, check_tags, save_in_chunks
+
+
+class FakeUpdateService:
+    """Stands in for omero's IUpdate, fails every call that includes a "bad" object"""
+    def __init__(self, lock):
+        self.lock = lock
+        self.calls = []
+
+    def _save(self, name, objs):
+        assert self.lock.locked()
+        self.calls.append((name, list(objs)))
+        if "bad" in objs:
+            raise RuntimeError("constraint violation")
+        return [f"saved-{o}" for o in objs]
+
+    def saveAndReturnArray(self, objs, opts):
+        return self._save("array", objs)
+
+    def saveArray(self, objs, opts):
+        self._save("array", objs)
+
+    def saveAndReturnObject(self, obj, opts):
+        return self._save("object", [obj])[0]
+
+
+def test_failing_chunk_is_saved_one_by_one():
+    lock = threading.Lock()
+    update = FakeUpdateService(lock)
+    result = BatchResult()
+    saved = save_in_chunks(update, ["a", "b", "c", "bad", "e"], [1, 2, 3, 4, 5], 2, result, lock=lock)
+
+    assert update.calls == [("array", ["a", "b"]), ("array", ["c", "bad"]), ("object", ["c"]), ("object", ["bad"]),
+                            ("array", ["e"])]
+    assert saved == ["saved-a", "saved-b", "saved-c", None, "saved-e"]
+    assert result.succeeded == [1, 2, 3, 5]
+    assert list(result.failed) == [4] and "constraint violation" in result.failed[4]
+    assert not result.ok
+
+
+def test_chunk_boundaries_without_returned_objects():
+    lock = threading.Lock()
+    update = FakeUpdateService(lock)
+    result = BatchResult()
+    save_in_chunks(update, list("abcd"), list("abcd"), 2, result, lock=lock, return_objects=False)
+    assert update.calls == [("array", ["a", "b"]), ("array", ["c", "d"])]
+    assert result.succeeded == list("abcd") and result.ok
+
+
+def test_check_tags_rejects_values_that_are_neither_text_nor_ids():
+    assert check_tags(iter(["new", 3, np.int64(4)])) == ["new", 3, np.int64(4)]
+    for bad in (2.5, None, True):
+        with pytest.raises(TypeError, match=repr(bad)):
+            check_tags(["new", bad])
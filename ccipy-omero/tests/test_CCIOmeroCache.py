@@ -0,0 +1,46 @@
+from ccipy.omero.CCIOmeroCache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_per_kind():
+    clock = FakeClock()
+    cache = TTLCache({"user": 10, "image": 1}, clock=clock)
+    cache.put("user", "current", "ada")
+    cache.put("image", 1, "img")
+    clock.now = 5
+    assert cache.get("user", "current") == "ada"
+    assert cache.get("image", 1) is None
+    assert cache.stats() == {"image": {"hits": 0, "misses": 1}, "user": {"hits": 1, "misses": 0}}
+
+
+def test_lru_eviction_and_uncached_kinds():
+    cache = TTLCache({"image": 60}, max_size=2)
+    for i in range(3):
+        cache.put("image", i, i)
+    assert cache.get("image", 0) is None
+    assert cache.get("image", 2) == 2
+    cache.put("dataset", 1, "not cached")
+    assert len(cache) == 2
+
+
+def test_get_or_load_and_invalidate():
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return ["p1"]
+
+    cache = TTLCache({"project": 60})
+    assert cache.get_or_load("project", 7, loader) == ["p1"]
+    assert cache.get_or_load("project", 7, loader) == ["p1"]
+    assert len(loads) == 1
+    cache.invalidate("project")
+    cache.get_or_load("project", 7, loader)
+    assert len(loads) == 2
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from ccipy.omero.CCIOmeroConnectionPool import OmeroConnectionPool
+
+
+class FakeConnection:
+    """Stands in for OmeroConnection, counts concurrent calls"""
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self, hostname, port, session_key):
+        self.session_key = session_key
+        self.alive = True
+        self.closed = False
+
+    def is_alive(self):
+        return self.alive
+
+    def close(self):
+        self.closed = True
+
+    def slow_call(self):
+        with FakeConnection.lock:
+            FakeConnection.active += 1
+            FakeConnection.max_active = max(FakeConnection.max_active, FakeConnection.active)
+        time.sleep(0.05)
+        with FakeConnection.lock:
+            FakeConnection.active -= 1
+
+
+@pytest.fixture
+def pool():
+    FakeConnection.active = FakeConnection.max_active = 0
+    p = OmeroConnectionPool("host", "4064", "session-key", max_size=3, connection_factory=FakeConnection,
+                            health_check_interval=0)
+    yield p
+    p.close()
+
+
+def test_connections_share_session_and_are_reused(pool):
+    with pool.connection() as c1:
+        assert c1.session_key == "session-key"
+    with pool.connection() as c2:
+        assert c2 is c1
+    assert pool.size == 1
+
+
+def test_calls_run_in_parallel_up_to_max_size(pool):
+    def worker():
+        with pool.connection() as conn:
+            conn.slow_call()
+
+    threads = [threading.Thread(target=worker) for _ in range(9)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert FakeConnection.max_active == 3
+    assert pool.size == 3
+
+
+def test_acquire_times_out_when_exhausted(pool):
+    conns = [pool.acquire() for _ in range(3)]
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+    for c in conns:
+        pool.release(c)
+
+
+def test_dead_connections_are_replaced(pool):
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.alive = False
+    new_conn = pool.acquire()
+    assert new_conn is not conn
+    assert conn.closed
+    assert pool.size == 1
+
+
+def test_connections_are_returned_on_base_exceptions(pool):
+    with pytest.raises(KeyboardInterrupt):
+        with pool.connection():
+            raise KeyboardInterrupt
+
+    # entered but never exited, closing the generator raises GeneratorExit inside it
+    abandoned = pool.connection()
+    abandoned.__enter__()
+    abandoned.gen.close()
+
+    conns = [pool.acquire(timeout=0.5) for _ in range(3)]
+    assert pool.size == 3 and not any(c.closed for c in conns)
+    for c in conns:
+        pool.release(c)
@@ -0,0 +1,90 @@
+import numpy as np
+
+from ccipy.omero.CCIOmeroPixels import TiledPixelReader
+
+IMAGE = np.arange(100 * 70, dtype=">u2").reshape(70, 100)
+
+
+class FakeStore:
+    def setPixelsId(self, pixels_id, bypass, ctx):
+        pass
+
+    def getResolutionLevels(self):
+        return 1
+
+    def setResolutionLevel(self, level):
+        pass
+
+    def getTileSize(self):
+        return 32, 16
+
+    def getTile(self, z, c, t, x, y, w, h, ctx):
+        return IMAGE[y:y + h, x:x + w].tobytes()
+
+    def close(self):
+        pass
+
+
+class FakeValue:
+    def __init__(self, value):
+        self.value = value
+
+    def getValue(self):
+        return self.value
+
+    def getId(self):
+        return self.value
+
+
+class FakePixels:
+    def getId(self):
+        return 1
+
+    def getPixelsType(self):
+        return FakeValue("uint16")
+
+    def getSizeX(self):
+        return IMAGE.shape[1]
+
+    def getSizeY(self):
+        return IMAGE.shape[0]
+
+
+class FakeImage:
+    def getId(self):
+        return 42
+
+    def getPrimaryPixels(self):
+        return FakePixels()
+
+
+class FakeConn:
+    SERVICE_OPTS = None
+
+    def __init__(self):
+        self.c = self
+        self.sf = self
+        self.stores = 0
+
+    def createRawPixelsStore(self):
+        self.stores += 1
+        return FakeStore()
+
+
+def test_tile_grid_follows_omero_tiles():
+    with TiledPixelReader(FakeConn(), FakeImage()) as reader:
+        grid = reader.tile_grid((20, 10, 50, 10))
+    assert grid == [[(20, 10, 12, 6), (32, 10, 32, 6), (64, 10, 6, 6)],
+                    [(20, 16, 12, 4), (32, 16, 32, 4), (64, 16, 6, 4)]]
+
+
+def test_read_region_matches_image(tmp_path):
+    conn = FakeConn()
+    with TiledPixelReader(conn, FakeImage(), max_workers=3, tile_cache_dir=tmp_path) as reader:
+        full = reader.read_region()
+        part = reader.read_region((5, 7, 60, 40))
+    np.testing.assert_array_equal(full, IMAGE)
+    np.testing.assert_array_equal(part, IMAGE[7:47, 5:65])
+    assert full.dtype == np.dtype("=u2")
+    assert conn.stores <= 3
+    assert any(tmp_path.rglob("*.npy"))
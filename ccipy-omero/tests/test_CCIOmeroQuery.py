@@ -0,0 +1,116 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ccipy.omero.CCIOmeroQuery import (COMMENT_QUERY, FILE_QUERY, IMAGE_COLUMNS, TAG_QUERY, GetOrCreate, images_metadata,
+                                     iter_pages, oldest_id_by_name)
+
+
+class FakeWrapper:
+    def __init__(self, obj_id, name):
+        self.obj_id = obj_id
+        self.name = name
+
+    def getId(self):
+        return self.obj_id
+
+    def getName(self):
+        return self.name
+
+
+class FakeGateway:
+    """Stands in for BlitzGateway's object listing and creation, with a slow create"""
+    def __init__(self, objects=()):
+        self.objects = list(objects)
+        self.pages = []
+        self.created = []
+        self.lock = threading.Lock()
+
+    def get_page(self, offset, limit):
+        self.pages.append(offset)
+        return self.objects[offset:offset + limit]
+
+    def find(self, name):
+        with self.lock:
+            return oldest_id_by_name(list(self.objects), name)
+
+    def create(self, name):
+        time.sleep(0.05)
+        with self.lock:
+            obj = FakeWrapper(100 + len(self.created), name)
+            self.objects.append(obj)
+            self.created.append(name)
+            return obj.obj_id
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+@pytest.mark.parametrize("n_objects, pages", [(7, [0, 3, 6]), (6, [0, 3, 6]), (0, [0])])
+def test_iter_pages_stops_after_short_page(prefetch, n_objects, pages):
+    gateway = FakeGateway(FakeWrapper(i, f"obj {i}") for i in range(n_objects))
+    items = list(iter_pages(gateway.get_page, 3, prefetch=prefetch))
+    assert [o.getId() for o in items] == list(range(n_objects))
+    assert sorted(gateway.pages) == pages
+
+
+def test_get_or_create_reuses_existing_objects():
+    gateway = FakeGateway([FakeWrapper(5, "dup"), FakeWrapper(2, "dup"), FakeWrapper(9, "other")])
+    get_or_create = GetOrCreate()
+
+    # name collisions resolve to the oldest object
+    assert get_or_create("dup", lambda: gateway.find("dup"), lambda: gateway.create("dup")) == 2
+    assert get_or_create("new", lambda: gateway.find("new"), lambda: gateway.create("new")) == 100
+    assert get_or_create("new", lambda: gateway.find("new"), lambda: gateway.create("new")) == 100
+    assert gateway.created == ["new"]
+
+
+def test_concurrent_get_or_create_creates_once():
+    gateway = FakeGateway()
+    get_or_create = GetOrCreate()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(lambda _: get_or_create("p", lambda: gateway.find("p"), lambda: gateway.create("p")),
+                            range(8)))
+    assert ids == [100] * 8
+    assert gateway.created == ["p"]
+
+
+class FakeQueryService:
+    """Answers the metadata projections from in-memory images and annotation links"""
+    def __init__(self, images, links):
+        self.images = images
+        self.links = links
+        self.calls = []
+
+    def projection(self, query, ids):
+        self.calls.append(list(ids))
+        if query.startswith("select i.id"):
+            return [list(row) for row in self.images if row[0] in ids]
+        kind = {TAG_QUERY: "tag", COMMENT_QUERY: "comment", FILE_QUERY: "file"}[query]
+        return [[image_id, ann_id, value] for k, image_id, ann_id, value in self.links if k == kind and image_id in ids]
+
+
+def test_images_metadata_columns():
+    images = [
+        (1, "a.tif", "first", 1000, 64, 32, 1, 2, 1, "uint16"),
+        (2, "b.tif", None, None, 16, 16, 5, 1, 1, "uint8"),
+        (2, "b.tif", None, None, 8, 8, 1, 1, 1, "uint8"),   # second pixels set
+        (3, "c.tif", "", 3000, 8, 8, 1, 1, 1, "float"),
+    ]
+    links = [("tag", 1, 10, "good"), ("tag", 1, 11, "nuclei"), ("comment", 3, 20, "blurry"),
+             ("file", 1, 30, "table.csv"), ("tag", 3, 10, "good")]
+    service = FakeQueryService(images, links)
+
+    result = images_metadata(service.projection, [3, 1, 99, 2, 1], chunk_size=2)
+
+    assert set(result) == set(IMAGE_COLUMNS) | {"tags", "comments", "files"}
+    # missing ids are dropped, duplicates kept, in request order
+    assert result["id"] == [3, 1, 2, 1]
+    assert result["name"] == ["c.tif", "a.tif", "b.tif", "a.tif"]
+    assert result["size_x"] == [8, 64, 16, 64]
+    assert result["pixel_type"] == ["float", "uint16", "uint8", "uint16"]
+    assert result["tags"] == [["good"], ["good", "nuclei"], [], ["good", "nuclei"]]
+    assert result["comments"] == [["blurry"], [], [], []]
+    assert result["files"] == [[], [(30, "table.csv")], [], [(30, "table.csv")]]
+    # four queries per chunk of unique ids
+    assert service.calls == [[3, 1]] * 4 + [[99, 2]] * 4
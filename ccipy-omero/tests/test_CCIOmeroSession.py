@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+from ccipy.omero.CCIOmeroSession import ReconnectingSession, retry_on_session_loss
+
+
+class ConnectionLost(Exception):
+    pass
+
+
+class SessionExpired(Exception):
+    pass
+
+
+class FakeServer:
+    """Sessions known to the server, and errors to raise on the next calls"""
+    def __init__(self):
+        self.sessions = {"key-1"}
+        self.errors = []
+        self.logins = 0
+
+    def login(self):
+        self.logins += 1
+        key = f"key-{self.logins + 1}"
+        self.sessions.add(key)
+        return key
+
+
+class FakeGateway:
+    def __init__(self, server, token):
+        self.server = server
+        self.token = token
+        self.closed = False
+
+    def getUserId(self):
+        if self.server.errors:
+            raise self.server.errors.pop(0)
+        return 42
+
+    def keepAlive(self):
+        return self.token in self.server.sessions and not self.closed
+
+    def close(self, hard=False):
+        self.closed = True
+
+
+class FakeConnection(ReconnectingSession):
+    """OmeroConnection's session handling on top of a fake gateway"""
+    TRANSPORT_ERRORS = (ConnectionLost,)
+    SESSION_EXPIRED_ERRORS = (SessionExpired,)
+
+    def __init__(self, server, session_factory=None, keepalive_interval=None):
+        self.hostname, self.port = "host", "4064"
+        self.server = server
+        self.cache_invalidations = 0
+        self._mutex = threading.Lock()
+        self._init_session_recovery(max_reconnect_attempts=2, session_factory=session_factory)
+        self._connect_to_omero(self.hostname, self.port, "key-1")
+        if keepalive_interval:
+            self._start_keepalive(keepalive_interval)
+
+    def _connect_to_omero(self, hostname, port, token):
+        self.omero_token = token
+        if token not in self.server.sessions:
+            raise ConnectionError("Failed to connect to OMERO")
+        self.conn = FakeGateway(self.server, token)
+
+    def is_alive(self):
+        return self.conn.keepAlive()
+
+    def invalidate_cache(self):
+        self.cache_invalidations += 1
+
+    def close(self):
+        self._stop_keepalive()
+        self.conn.close()
+
+    @retry_on_session_loss
+    def get_user_id(self):
+        return self.conn.getUserId()
+
+
+def test_lost_connection_is_rejoined_and_retried():
+    server = FakeServer()
+    conn = FakeConnection(server)
+    server.errors.append(ConnectionLost())
+    assert conn.get_user_id() == 42
+    assert conn.omero_token == "key-1"
+    assert conn.connection_stats()["reconnects"] == 1 and conn.cache_invalidations == 1
+
+    # a connection that is still down after the reconnect fails the call
+    server.errors.extend([ConnectionLost(), ConnectionLost()])
+    with pytest.raises(ConnectionLost):
+        conn.get_user_id()
+
+
+def test_expired_session_is_not_rejoined():
+    server = FakeServer()
+    conn = FakeConnection(server)
+    server.errors.append(SessionExpired())
+    with pytest.raises(SessionExpired):
+        conn.get_user_id()
+    assert conn.reconnects == 0
+
+
+def test_expired_session_is_replaced_by_session_factory():
+    server = FakeServer()
+    conn = FakeConnection(server, session_factory=server.login)
+    server.sessions.discard("key-1")
+    server.errors.append(SessionExpired())
+    assert conn.get_user_id() == 42
+    assert conn.omero_token == "key-2" and server.logins == 1
+
+
+def test_keepalive_reconnects_and_stops_on_close():
+    server = FakeServer()
+    conn = FakeConnection(server, session_factory=server.login, keepalive_interval=0.02)
+    old_gateway = conn.conn
+    old_gateway.closed = True      # connection dropped, session still there
+    deadline = time.monotonic() + 2
+    while conn.conn is old_gateway and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert conn.conn is not old_gateway and conn.omero_token == "key-1"
+
+    # session expired on the server: rejoining fails, a new session is opened
+    server.sessions.discard("key-1")
+    deadline = time.monotonic() + 5
+    while conn.omero_token == "key-1" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert conn.omero_token == "key-2" and conn.is_alive()
+
+    conn.close()
+    assert not conn._keepalive_thread.is_alive()
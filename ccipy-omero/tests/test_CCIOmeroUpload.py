@@ -0,0 +1,80 @@
+import hashlib
+
+from ccipy.omero.CCIOmeroUpload import OmeroUploader, file_checksum
+
+
+class FakeConnection:
+    def __init__(self, existing_hashes=()):
+        self.existing_hashes = set(existing_hashes)
+        self.created = []
+
+    def get_or_create_project(self, name):
+        self.created.append(("project", name))
+        return 1
+
+    def get_or_create_dataset(self, project_id, name):
+        self.created.append(("dataset", name))
+        return 2
+
+    def get_dataset_file_hashes(self, dataset_id):
+        return set(self.existing_hashes)
+
+
+def make_files(tmp_path, contents):
+    paths = []
+    for i, content in enumerate(contents):
+        p = tmp_path / f"img_{i}.tif"
+        p.write_bytes(content)
+        paths.append(p)
+    return paths
+
+
+def test_upload_dedupes_and_retries(tmp_path):
+    paths = make_files(tmp_path, [b"a", b"b", b"a", b"c"])
+    conn = FakeConnection(existing_hashes=[hashlib.sha1(b"c").hexdigest()])
+    attempts = {}
+
+    def fake_import(dataset_id, path):
+        attempts[path.name] = attempts.get(path.name, 0) + 1
+        if path.name == "img_1.tif" and attempts[path.name] < 2:
+            raise RuntimeError("temporary failure")
+        return [len(attempts)]
+
+    report = OmeroUploader(conn, max_workers=2, backoff_s=0, import_fn=fake_import).upload(paths, "proj", "ds")
+    assert conn.created == [("project", "proj"), ("dataset", "ds")]
+    assert sorted(report.skipped) == [str(paths[2]), str(paths[3])]
+    assert sorted(report.image_ids) == [str(paths[0]), str(paths[1])]
+    assert attempts == {"img_0.tif": 1, "img_1.tif": 2}
+    assert report.bytes_uploaded == 2
+    assert not report.failed
+
+
+def test_upload_reports_failures(tmp_path):
+    paths = make_files(tmp_path, [b"a"])
+
+    def failing_import(dataset_id, path):
+        raise RuntimeError("server says no")
+
+    report = OmeroUploader(FakeConnection(), max_retries=1, backoff_s=0, import_fn=failing_import).upload(paths, "p", "d")
+    assert report.failed == {str(paths[0]): "server says no"}
+
+
+def test_directory_checksum_is_stable(tmp_path):
+    (tmp_path / "a.zarr" / "0").mkdir(parents=True)
+    (tmp_path / "a.zarr" / "0" / "chunk").write_bytes(b"x")
+    assert file_checksum(tmp_path / "a.zarr") == file_checksum(tmp_path / "a.zarr")
+
+
+def test_unreadable_file_fails_alone(tmp_path):
+    paths = make_files(tmp_path, [b"a", b"b"])
+    missing = tmp_path / "gone.tif"
+    imported = []
+
+    def fake_import(dataset_id, path):
+        imported.append(path)
+        return [len(imported)]
+
+    report = OmeroUploader(FakeConnection(), import_fn=fake_import).upload([paths[0], missing, paths[1]], "p", "d")
+    assert sorted(imported) == paths
+    assert list(report.failed) == [str(missing)]
+    assert sorted(report.image_ids) == [str(p) for p in paths]
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = ("Ice", "omero")
+
+
+def run_without(modules, code: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter where importing any of modules fails, installed or not."""
+    block = f"import sys; sys.modules.update(dict.fromkeys({list(modules)!r}))\n"
+    return subprocess.run([sys.executable, "-c", block + code], capture_output=True, text=True)
+
+
+def test_blocked_modules_cannot_be_imported():
+    assert run_without(HEAVY_MODULES, "import omero.gateway").returncode != 0
+
+
+def test_package_import_does_not_load_omero():
+    res = run_without(HEAVY_MODULES, "import ccipy.omero; ccipy.omero.OmeroConnectionPool")
+    assert res.returncode == 0, res.stderr
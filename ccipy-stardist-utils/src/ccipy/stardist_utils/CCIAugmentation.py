@@ -0,0 +1,162 @@
+"""
+    float32 training augmentation for StarDist, safe to run from several threads or processes
+"""
+import itertools
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ccipy.stardist_utils.CCIStardistUtils import random_fliprot
+
+
+class AugmentationPipeline:
+    """
+    Random flips/rotations, intensity scale and shift and gaussian noise, like
+    CCIStardistUtils.augmenter, but computed in float32 with one np.random.Generator
+    per thread and process, so no float64 image sized temporaries are created and
+    forked data loader workers do not repeat each other's random numbers.
+
+    Flips and rotations keep the shape of the images, so non square patches
+    can be batched. An instance is a drop in StarDist augmenter (pipeline(x, y)). Passed to
+    CCIStarDistWrapper.train, the training batches are also prepared ahead of
+    the training step on a thread pool (see prefetching_fit). batches() does
+    the same for custom training loops, on n_workers threads.
+    """
+
+    def __init__(self, n_workers: int = 4, seed: int | None = None, fliprot: bool = True,
+                 intensity_scale: tuple[float, float] = (0.6, 2.0), intensity_shift: tuple[float, float] = (-0.2, 0.2),
+                 max_noise_sigma: float = 0.02):
+        self.n_workers = n_workers
+        self.fliprot = fliprot
+        self.intensity_scale = intensity_scale
+        self.intensity_shift = intensity_shift
+        self.max_noise_sigma = max_noise_sigma
+        self._entropy = np.random.SeedSequence(seed).entropy
+        self._local = threading.local()
+        self._stream_ids = itertools.count()
+
+    @property
+    def rng(self) -> np.random.Generator:
+        """The generator of the calling thread, created on first use in each thread and process."""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.pid = os.getpid()
+            seed_seq = np.random.SeedSequence(self._entropy, spawn_key=(local.pid, next(self._stream_ids)))
+            local.rng = np.random.default_rng(seed_seq)
+        return local.rng
+
+    def __call__(self, x: np.ndarray, y: np.ndarray, out: np.ndarray | None = None):
+        """Augment one image/label pair, out optionally receives the float32 image if it has its shape."""
+        rng = self.rng
+        if self.fliprot:
+            x, y = random_fliprot(x, y, rng, keep_shape=True)
+        # one float32 copy of x, everything after that happens in place
+        if out is None or out.shape != np.shape(x):
+            x = np.array(x, dtype=np.float32)
+        else:
+            np.copyto(out, x, casting="unsafe")
+            x = out
+        x *= np.float32(rng.uniform(*self.intensity_scale))
+        x += np.float32(rng.uniform(*self.intensity_shift))
+        sigma = np.float32(self.max_noise_sigma * rng.random())
+        if sigma > 0:
+            noise = rng.standard_normal(x.shape, dtype=np.float32)
+            noise *= sigma
+            x += noise
+        return x, y
+
+    def augment_batch(self, X, Y):
+        """Augment a list of same shaped image/label pairs into stacked batch arrays."""
+        shapes = {np.shape(x) for x in X} | {np.shape(x)[:np.ndim(y)] for x, y in zip(X, Y)}
+        if len(shapes) > 1:
+            raise ValueError(f"images and labels of a batch must have one shape, got {sorted(shapes)}")
+        x_batch = np.empty((len(X),) + np.shape(X[0]), dtype=np.float32)
+        y_batch = np.empty((len(Y),) + np.shape(Y[0]), dtype=np.asarray(Y[0]).dtype)
+        for i, (x, y) in enumerate(zip(X, Y)):
+            # augment straight into the batch slot
+            _, y_batch[i] = self(x, y, out=x_batch[i])
+        return x_batch, y_batch
+
+    def batches(self, X, Y, batch_size: int = 4, epochs: int = 1, shuffle: bool = True, prefetch: int | None = None):
+        """
+        Yield (x_batch, y_batch) for epochs passes over X, Y. Up to prefetch
+        batches (default 2 * n_workers) are augmented ahead on the thread pool.
+        Images must be of one shape, e.g. training patches.
+        """
+        if len(X) != len(Y):
+            raise ValueError(f"X and Y differ in length: {len(X)} != {len(Y)}")
+        prefetch = prefetch or 2 * self.n_workers
+        order_rng = np.random.default_rng(self._entropy)
+
+        def batch_indices():
+            for _ in range(epochs):
+                order = order_rng.permutation(len(X)) if shuffle else np.arange(len(X))
+                for i in range(0, len(order), batch_size):
+                    yield order[i:i + batch_size]
+
+        with ThreadPoolExecutor(max_workers=self.n_workers, thread_name_prefix="augment") as pool:
+            pending = deque()
+            for idx in batch_indices():
+                pending.append(pool.submit(self.augment_batch, [X[i] for i in idx], [Y[i] for i in idx]))
+                if len(pending) >= prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def prefetch(self, data, depth: int | None = None):
+        """
+        Iterate over data with the next depth (default 2 * n_workers) batches prepared
+        ahead on threads. A sequence (len and indexing, e.g. a keras Sequence) is read on
+        n_workers threads, an iterator on one thread running ahead of the consumer.
+        """
+        depth = depth or 2 * self.n_workers
+        if hasattr(data, "__getitem__") and hasattr(data, "__len__"):
+            n_workers, n_items = self.n_workers, len(data)
+            read = data.__getitem__
+            fetches = iter(range(n_items))
+        else:
+            # an iterator cannot be advanced from several threads at once
+            n_workers, n_items = 1, None
+            source = iter(data)
+            end = object()
+            read = lambda _: next(source, end)  # noqa: E731
+            fetches = itertools.count()
+
+        with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="augment") as pool:
+            pending = deque(pool.submit(read, i) for i in itertools.islice(fetches, depth))
+            while pending:
+                item = pending.popleft().result()
+                if n_items is None and item is end:
+                    return
+                for i in itertools.islice(fetches, 1):
+                    pending.append(pool.submit(read, i))
+                yield item
+
+    @contextmanager
+    def prefetching_fit(self, keras_model):
+        """
+        Within the block, keras_model.fit receives its training data through prefetch(),
+        for trainers such as StarDist2D.train that build their data and call fit themselves.
+        Keras' own workers are turned off: forked workers would each iterate a copy of the
+        prefetching iterator and repeat batches.
+        """
+        fit = keras_model.fit
+        iterators = []
+
+        def fit_prefetched(x=None, *args, **kwargs):
+            kwargs["workers"] = 1
+            kwargs["use_multiprocessing"] = False
+            iterators.append(self.prefetch(x))
+            return fit(iterators[-1], *args, **kwargs)
+
+        keras_model.fit = fit_prefetched
+        try:
+            yield
+        finally:
+            del keras_model.fit
+            for it in iterators:
+                it.close()
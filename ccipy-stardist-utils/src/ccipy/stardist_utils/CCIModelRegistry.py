@@ -0,0 +1,120 @@
+"""
+    Process wide cache of loaded StarDist models
+"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+# files whose change means a model has to be loaded again
+_MODEL_FILES = ("config.json", "thresholds.json", "weights_best.h5", "weights_last.h5")
+
+
+def _load_stardist2d(name: str, basedir: str):
+    from stardist.models import StarDist2D
+    return StarDist2D(None, name=name, basedir=basedir)
+
+
+def model_mtime(name: str, basedir: str) -> int:
+    """Newest modification time (ns) of the config and weight files of a model, 0 if there are none."""
+    mtime = 0
+    for file_name in _MODEL_FILES:
+        try:
+            mtime = max(mtime, os.stat(os.path.join(basedir, name, file_name)).st_mtime_ns)
+        except FileNotFoundError:
+            pass
+    return mtime
+
+
+class ModelRegistry:
+    """
+    LRU cache of loaded models keyed by (name, basedir, weights mtime), so a model
+    is read from disk once and again only after its weights were rewritten.
+    get_latest() follows the model name in a latest.mod file, which is only
+    re-read when the file changes, so save_latest_model_name hot swaps the model
+    served to the next request. At most max_models models stay loaded.
+    loader(name, basedir) loads a model, it defaults to StarDist2D.
+    """
+
+    def __init__(self, max_models: int = 4, loader: Callable[[str, str], Any] | None = None):
+        self.max_models = max_models
+        self._loader = loader or _load_stardist2d
+        self._models: OrderedDict[tuple[str, str, int], Any] = OrderedDict()
+        self._latest: dict[str, tuple[int, str]] = {}
+        self._lock = threading.Lock()
+        # one lock per model so concurrent requests for a model load it once
+        self._load_locks: dict[tuple[str, str], threading.Lock] = {}
+
+    def get(self, name: str, basedir: str = "models"):
+        basedir = os.path.abspath(basedir)
+        key = (name, basedir, model_mtime(name, basedir))
+        with self._lock:
+            model = self._get_locked(key)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault(key[:2], threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                model = self._get_locked(key)
+            if model is not None:
+                return model
+            model = self._loader(name, basedir)
+            with self._lock:
+                # drop older versions of the same model
+                for old in [k for k in self._models if k[:2] == key[:2]]:
+                    del self._models[old]
+                self._models[key] = model
+                while len(self._models) > self.max_models:
+                    self._models.popitem(last=False)
+            return model
+
+    def _get_locked(self, key):
+        model = self._models.get(key)
+        if model is not None:
+            self._models.move_to_end(key)
+        return model
+
+    def latest_name(self, file_path: str = "latest.mod") -> str:
+        """Model name stored in file_path, read again only when the file changed."""
+        path = os.path.abspath(file_path)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._latest.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        name = Path(path).read_text(encoding="utf-8").strip()
+        with self._lock:
+            self._latest[path] = (mtime, name)
+        return name
+
+    def get_latest(self, basedir: str = "models", file_path: str = "latest.mod"):
+        return self.get(self.latest_name(file_path), basedir)
+
+    def forget_latest(self, file_path: str = "latest.mod"):
+        """Re-read file_path on the next get_latest, for file systems with coarse mtimes."""
+        with self._lock:
+            self._latest.pop(os.path.abspath(file_path), None)
+
+    def warm(self, names: Iterable[str] = (), basedir: str = "models", latest_file: str | None = None):
+        """Load models ahead of the first request, e.g. at service startup."""
+        for name in names:
+            self.get(name, basedir)
+        if latest_file is not None:
+            self.get_latest(basedir, latest_file)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._latest.clear()
+
+    def __len__(self):
+        return len(self._models)
+
+    def __contains__(self, name: str) -> bool:
+        return any(k[0] == name for k in self._models)
+
+
+# shared by get_sd_model, get_latest_sd_model and CCIStarDistWrapper.load_model_by_name
+default_registry = ModelRegistry()
@@ -0,0 +1,89 @@
+"""
+    Slice by slice 2D segmentation of 3D stacks, linked into 3D instances
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+
+def link_slice(prev_labels: np.ndarray, prev_ids: np.ndarray, labels: np.ndarray, next_id: int,
+               iou_threshold: float = 0.3) -> tuple[np.ndarray, int]:
+    """
+    Match the labels of a slice to those of the previous slice by overlap.
+    prev_ids maps the previous slice's labels to 3D instance ids. Each label
+    takes the id of the previous label it overlaps with the highest IoU
+    (at least iou_threshold, every id used once), others get new ids from next_id.
+    Returns the label -> instance id map of this slice and the next free id.
+    """
+    n_labels = int(labels.max()) + 1
+    ids = np.zeros(n_labels, dtype=np.int64)
+    areas = np.bincount(labels.ravel(), minlength=n_labels)
+
+    if prev_labels is not None:
+        n_prev = int(prev_labels.max()) + 1
+        prev_areas = np.bincount(prev_labels.ravel(), minlength=n_prev)
+        both = (prev_labels > 0) & (labels > 0)
+        pairs, inter = np.unique(prev_labels[both].astype(np.int64) * n_labels + labels[both], return_counts=True)
+        prev, curr = np.divmod(pairs, n_labels)
+        iou = inter / (prev_areas[prev] + areas[curr] - inter)
+        keep = iou >= iou_threshold
+        prev, curr, iou = prev[keep], curr[keep], iou[keep]
+        used_prev = set()
+        for k in np.argsort(-iou, kind="stable"):
+            p, c = prev[k], curr[k]
+            if ids[c] == 0 and p not in used_prev:
+                ids[c] = prev_ids[p]
+                used_prev.add(p)
+
+    new = np.flatnonzero((ids == 0) & (areas > 0))
+    new = new[new > 0]
+    ids[new] = np.arange(next_id, next_id + len(new))
+    return ids, next_id + len(new)
+
+
+def predict_stack(predict_fn: Callable[[np.ndarray], np.ndarray], vol, axis: int = 0, out=None,
+                  iou_threshold: float = 0.3, n_workers: int = 2, dtype=np.int32):
+    """
+    Segment vol (numpy, zarr or dask) slice by slice along axis with predict_fn(slice) -> 2D labels
+    and link the labels of neighbouring slices into 3D instances (see link_slice).
+    predict_fn is only called from one thread, as Keras models cannot predict concurrently.
+    Up to 2 * n_workers slices are read ahead on n_workers threads, and a slice is linked and
+    written while the next one is predicted, so only a few slices are held in memory.
+        out: a path to create a zarr array at, an array supporting slice assignment,
+             or None for a numpy array. The slice axis is the first axis of the output.
+    Returns out.
+    """
+    axis = axis % len(vol.shape)
+    n_slices = vol.shape[axis]
+    out_shape = (n_slices,) + tuple(s for i, s in enumerate(vol.shape) if i != axis)
+    if isinstance(out, (str, bytes)) or hasattr(out, "__fspath__"):
+        import zarr
+        out = zarr.open(str(out), mode="w", shape=out_shape, chunks=(1,) + out_shape[1:], dtype=dtype)
+    elif out is None:
+        out = np.zeros(out_shape, dtype=dtype)
+
+    def read_slice(i):
+        img = vol[(slice(None),) * axis + (i,)]
+        if hasattr(img, "compute"):
+            img = img.compute()
+        return np.asarray(img)
+
+    def predict_slice(read):
+        return np.asarray(predict_fn(read.result()))
+
+    prev_labels, prev_ids, next_id = None, None, 1
+    with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="read-stack") as readers, \
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict-stack") as predictor:
+        pending = deque()
+        submitted = 0
+        for i in range(n_slices):
+            while submitted < n_slices and len(pending) < 2 * n_workers:
+                pending.append(predictor.submit(predict_slice, readers.submit(read_slice, submitted)))
+                submitted += 1
+            labels = pending.popleft().result()
+            ids, next_id = link_slice(prev_labels, prev_ids, labels, next_id, iou_threshold)
+            out[i] = ids[labels]
+            prev_labels, prev_ids = labels, ids
+    return out
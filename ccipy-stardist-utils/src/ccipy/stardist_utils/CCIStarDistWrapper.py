@@ -1,10 +1,43 @@
 """
     Wrapper for stardist models in a way that is compatible with CCI code elsewhere
 """
+from __future__ import annotations
 #import tqdm
-import stardist.models
+import warnings
+
+import numpy as np
 #from stardist.matching import matching_dataset
-from typing import Tuple, Any
+from typing import TYPE_CHECKING, Tuple, Any
+from ccipy.stardist_utils.CCIAugmentation import AugmentationPipeline
+from ccipy.stardist_utils.CCIModelRegistry import default_registry
+from ccipy.stardist_utils.CCIStackPrediction import predict_stack
+from ccipy.stardist_utils.CCITrainingData import SampleSequence
+
+# stardist pulls in TensorFlow, it is only imported once a model is created
+if TYPE_CHECKING:
+    import stardist.models
+
+
+class _NumpySlicer:
+    """
+    Read only view of a dask or zarr array whose slices are numpy arrays,
+    so StarDist only ever loads the block it is working on.
+    """
+    def __init__(self, array):
+        self.array = array
+        self.shape = tuple(array.shape)
+        self.ndim = len(self.shape)
+        self.dtype = np.dtype(array.dtype)
+
+    def __getitem__(self, key):
+        block = self.array[key]
+        if hasattr(block, "compute"):
+            block = block.compute()
+        return np.asarray(block)
+
+    def __len__(self):
+        return self.shape[0]
+
     
 class CCIStarDistWrapper:
     
@@ -15,20 +48,82 @@ class CCIStarDistWrapper:
         
     @classmethod
     def load_model_by_name(cls, model_name: str, basedir: str = 'models') -> CCIStarDistWrapper:
-        return cls(stardist.models.StarDist2D(None, name=model_name, basedir=basedir), model_name=model_name, basedir=basedir) 
+        return cls(default_registry.get(model_name, basedir), model_name=model_name, basedir=basedir) 
     
     @classmethod
-    def new_model(cls, config = stardist.models.Config2D, model_name: str = "latest", basedir: str = 'models') -> CCIStarDistWrapper:
+    def new_model(cls, config: stardist.models.Config2D | None = None, model_name: str = "latest", basedir: str = 'models') -> CCIStarDistWrapper:
+        import stardist.models
+        if config is None:
+            config = stardist.models.Config2D()
         return cls(stardist.models.StarDist2D(config, name=model_name, basedir=basedir), model_name=model_name, basedir=basedir)
     
     
     def predict(self, img, **kwargs):
         return self.model.predict_instances(img, **kwargs)
+
+    def predict_large(self, array, block_size: int = 4096, overlap: int = 128, axes: str = "YX", labels_out=None,
+                      context: int | None = None, **kwargs):
+        """
+        Segment an image too large for memory, e.g. level 0 of an OME-Zarr written by
+        maps_to_ome_zarr, given as a dask, zarr or numpy array.
+        The image is processed block by block (block_size pixels plus overlap on each
+        side), only one block is in memory at a time. Objects cut by a block border
+        are dropped in that block and kept from the neighbouring block, so labels,
+        polygons and points come out consistent over the whole image.
+            labels_out: a path to create a zarr label array at, any array supporting
+                        slice assignment (e.g. an existing zarr array), or None for an
+                        in-memory numpy label image
+            kwargs: passed on to predict_instances for each block, e.g. normalizer,
+                    prob_thresh, n_tiles
+        Returns (labels, polys) as StarDist2D.predict_instances_big does.
+        """
+        label_shape = tuple(size for size, ax in zip(array.shape, axes.upper()) if ax != "C")
+        if isinstance(labels_out, (str, bytes)) or hasattr(labels_out, "__fspath__"):
+            import zarr
+            chunk = min(block_size, *label_shape)
+            labels_out = zarr.open(str(labels_out), mode="w", shape=label_shape, chunks=(chunk, chunk), dtype=np.int32)
+        elif labels_out is None:
+            labels_out = np.zeros(label_shape, dtype=np.int32)
+
+        img = array if isinstance(array, np.ndarray) else _NumpySlicer(array)
+        return self.model.predict_instances_big(img, axes=axes, block_size=block_size, min_overlap=overlap,
+                                                context=context, labels_out=labels_out, **kwargs)
+    
+    def predict_stack(self, vol, axis: int = 0, out=None, iou_threshold: float = 0.3, n_workers: int = 2, **kwargs):
+        """
+        Segment a 3D stack slice by slice along axis and link the slice labels into
+        3D instances by IoU, see CCIStackPrediction.predict_stack. The model predicts
+        one slice at a time, n_workers threads read the next slices meanwhile.
+        kwargs are passed on to predict_instances for each slice.
+        """
+        def predict_fn(img):
+            return self.model.predict_instances(img, **kwargs)[0]
+        return predict_stack(predict_fn, vol, axis=axis, out=out, iou_threshold=iou_threshold, n_workers=n_workers)
     
-    def train(self, X, Y, validation_data: Tuple[Any, Any], augmenter = None, epochs=300 **kwargs):
+    def train(self, X, Y, validation_data: Tuple[Any, Any], augmenter = None, epochs=300, **kwargs):
+        """
+        Train the model and optimize its thresholds, kwargs are passed on to StarDist2D.train.
+        With an AugmentationPipeline as augmenter, training batches are sampled and augmented
+        ahead of the training step on the pipeline's threads. Otherwise data loading stays in
+        the training thread unless workers > 1 is passed: StarDist then sets use_multiprocessing
+        and Keras forks workers that each iterate their own copy of the training generator, so
+        batches are repeated across workers.
+        """
         X_val, Y_val = validation_data
-        self.model.train(X, Y, validation_data=validation_data, augmenter=augmenter, epochs=epochs, **kwargs)
-        self.model.optimize_thresholds(X, Y)
+        if isinstance(X, SampleSequence) and getattr(self.model.config, "train_sample_cache", False):
+            # the sample cache keeps the patch regions of every training image in memory
+            warnings.warn("train_sample_cache is turned off for disk backed training data")
+            self.model.config.train_sample_cache = False
+        if isinstance(augmenter, AugmentationPipeline):
+            with augmenter.prefetching_fit(self.model.keras_model):
+                self.model.train(X, Y, validation_data=validation_data, augmenter=augmenter, epochs=epochs, **kwargs)
+        else:
+            self.model.train(X, Y, validation_data=validation_data, augmenter=augmenter, epochs=epochs, **kwargs)
+        if isinstance(X, SampleSequence):
+            # optimize_thresholds keeps a prediction per image in memory, too much for disk backed data
+            self.model.optimize_thresholds(X_val, Y_val)
+        else:
+            self.model.optimize_thresholds(X, Y)
         #Y_val_pred = [self.model.predict_instances(x, n_tiles=self.model._guess_n_tiles(x), show_tile_progress=False)[0]
         #              for x in tqdm(X_val)]
 
@@ -1,5 +1,6 @@
 import numpy as np
-from stardist.models import StarDist2D
+from ccipy.stardist_utils.CCIModelRegistry import default_registry
+from ccipy.stardist_utils.CCITrainingData import SampleSequence
 
 
 def get_latest_model_name(file_path="latest.mod"):
@@ -11,16 +12,16 @@ def get_latest_model_name(file_path="latest.mod"):
 def save_latest_model_name(model_name, file_path="latest.mod"):
     with open(file_path, "w", encoding="utf-8") as f:
         f.write(model_name)
+    default_registry.forget_latest(file_path)
         
   
 def get_latest_sd_model(basedir='models', file_path="latest.mod"):
-    latest_model = get_latest_model_name(file_path)
-    model = StarDist2D(None, name=latest_model, basedir=basedir)
-    return model
+    """The model named in file_path, cached by the default ModelRegistry."""
+    return default_registry.get_latest(basedir, file_path)
 
 def get_sd_model(model_name, basedir='models'):
-    model = StarDist2D(None, name=model_name, basedir=basedir)
-    return model
+    """Cached by the default ModelRegistry, reloaded only when the weights change."""
+    return default_registry.get(model_name, basedir)
     
 def split_slices(vol, depth_axis=0, copy=False):
     # Move depth axis to the front so indexing is simple and returns views
@@ -29,14 +30,27 @@ def split_slices(vol, depth_axis=0, copy=False):
     return [s if not copy else s.copy() for s in v]
 
 
-def random_fliprot(img, mask): 
+def random_fliprot(img, mask, rng: np.random.Generator | None = None, keep_shape: bool = False):
+    """
+    Random axis permutation and flips of img and mask, drawn from rng (default: the global numpy state).
+    With keep_shape set only axes of equal length are swapped, so non square patches keep their shape.
+    """
+    rng = np.random if rng is None else rng
     assert img.ndim >= mask.ndim
     axes = tuple(range(mask.ndim))
-    perm = tuple(np.random.permutation(axes))
+    if keep_shape:
+        perm = list(axes)
+        for size in dict.fromkeys(mask.shape):
+            group = [ax for ax in axes if mask.shape[ax] == size]
+            for ax, new_ax in zip(group, rng.permutation(group)):
+                perm[ax] = int(new_ax)
+        perm = tuple(perm)
+    else:
+        perm = tuple(rng.permutation(axes))
     img = img.transpose(perm + tuple(range(mask.ndim, img.ndim))) 
     mask = mask.transpose(perm) 
     for ax in axes: 
-        if np.random.rand() > 0.5:
+        if rng.random() > 0.5:
             img = np.flip(img, axis=ax)
             mask = np.flip(mask, axis=ax)
     return img, mask 
@@ -70,6 +84,14 @@ def augmenter(x, y):
     x = x + sig*np.random.normal(0,1,x.shape)
     return x, y
 
-def prune_empty_labels(images, labels):
+def prune_empty_labels(images, labels, nonempty=None):
+    """
+    Drop the image/label pairs without any object.
+    With a precomputed per sample nonempty index (see CCITrainingData) no label
+    image is read and lazy SampleSequences are returned instead of tuples.
+    """
+    if nonempty is not None:
+        keep = np.flatnonzero(nonempty)
+        return SampleSequence(images, keep), SampleSequence(labels, keep)
     img_lab = [(i,l) for (i,l) in zip(images,labels) if np.max(l)>0]
     return zip(*img_lab)
@@ -0,0 +1,169 @@
+"""
+    Disk backed training data for StarDist, read one sample at a time
+"""
+import os
+import stat
+from pathlib import Path
+
+import numpy as np
+
+
+def compute_nonempty_index(labels, chunk_size: int = 64) -> np.ndarray:
+    """Boolean per sample, True where the label image has any object. Reads chunk_size samples at a time."""
+    nonempty = np.zeros(len(labels), dtype=bool)
+    for start in range(0, len(labels), chunk_size):
+        block = np.asarray(labels[start:start + chunk_size])
+        nonempty[start:start + len(block)] = block.reshape(len(block), -1).any(axis=1)
+    return nonempty
+
+
+class SampleSequence:
+    """
+    Sequence view of the samples (first axis) of a memory mapped, zarr or other
+    sliceable array, optionally restricted to some indices. Samples are only
+    read when indexed, so it can be given to StarDist's train as X or Y.
+    """
+
+    def __init__(self, array, indices=None):
+        self.array = array
+        self.indices = np.arange(len(array)) if indices is None else np.asarray(indices)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return SampleSequence(self.array, self.indices[i])
+        return np.asarray(self.array[int(self.indices[i])])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def subset(self, indices) -> "SampleSequence":
+        return SampleSequence(self.array, self.indices[np.asarray(indices)])
+
+
+def newest_mtime_ns(path: str | Path) -> int:
+    """
+    Modification time of path, for a directory the newest of it and all its
+    subdirectories. Chunk writes that replace files update the mtime of the
+    directory holding them, which is nested for zarr's "/" dimension separator.
+    Only directories are stat'ed, not every chunk file.
+    """
+    st = os.stat(path)
+    mtime_ns = st.st_mtime_ns
+    if stat.S_ISDIR(st.st_mode):
+        for dir_path, dir_names, _ in os.walk(path):
+            for name in dir_names:
+                mtime_ns = max(mtime_ns, os.stat(os.path.join(dir_path, name)).st_mtime_ns)
+    return mtime_ns
+
+
+def index_key(labels, source_path: str | Path | None = None) -> dict:
+    """
+    What a nonempty index was computed from: the label array's shape and the
+    newest_mtime_ns of the file or directory holding it, if known.
+    """
+    mtime_ns = None
+    if source_path is not None:
+        try:
+            mtime_ns = newest_mtime_ns(source_path)
+        except OSError:
+            pass
+    return {"shape": [int(s) for s in labels.shape], "mtime_ns": mtime_ns}
+
+
+class LazyTrainingData:
+    """
+    Images and labels stored as (N, Y, X[, C]) arrays on disk, with a per sample
+    non-empty index computed once (and kept in index_path, if given) instead of
+    checking every label image on each run. A kept index is recomputed when the
+    labels' shape or the modification time of source_path changed.
+    """
+
+    def __init__(self, images, labels, nonempty: np.ndarray | None = None, index_path: str | Path | None = None,
+                 source_path: str | Path | None = None):
+        if len(images) != len(labels):
+            raise ValueError(f"images and labels differ in length: {len(images)} != {len(labels)}")
+        if nonempty is not None and len(nonempty) != len(labels):
+            raise ValueError(f"nonempty index and labels differ in length: {len(nonempty)} != {len(labels)}")
+        self.images = images
+        self.labels = labels
+        self.index_path = Path(index_path) if index_path is not None else None
+        self.source_path = source_path
+        self._nonempty = nonempty
+
+    @classmethod
+    def from_npy(cls, image_path: str | Path, label_path: str | Path, index_path: str | Path | None = None):
+        """Memory map .npy files, the index defaults to <label file>.nonempty.npz."""
+        if index_path is None:
+            index_path = Path(label_path).with_suffix(".nonempty.npz")
+        return cls(np.load(image_path, mmap_mode="r"), np.load(label_path, mmap_mode="r"), index_path=index_path,
+                   source_path=label_path)
+
+    @classmethod
+    def from_zarr(cls, path: str | Path, images: str = "images", labels: str = "labels",
+                  index_path: str | Path | None = None):
+        """
+        Open the images and labels arrays of a zarr group read only, nothing is
+        written to the store. The index defaults to <store>.<labels>.nonempty.npz
+        next to it. Label chunks rewritten in place, without replacing their file,
+        are not noticed, delete the index file after such writes.
+        """
+        import zarr
+        path = Path(path)
+        group = zarr.open(str(path), mode="r")
+        if index_path is None:
+            index_path = path.with_name(f"{path.stem}.{labels}.nonempty.npz")
+        return cls(group[images], group[labels], index_path=index_path, source_path=path / labels)
+
+    @property
+    def nonempty(self) -> np.ndarray:
+        if self._nonempty is None:
+            key = index_key(self.labels, self.source_path)
+            self._nonempty = self._load_index(key)
+            if self._nonempty is None:
+                self._nonempty = compute_nonempty_index(self.labels)
+                if self.index_path is not None:
+                    self._save_index(key)
+        return self._nonempty
+
+    def _save_index(self, key: dict):
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, nonempty=self._nonempty, shape=key["shape"], mtime_ns=key["mtime_ns"] or -1)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            # the index is only an optimization, e.g. read only shares are used as they are
+            pass
+
+    def _load_index(self, key: dict) -> np.ndarray | None:
+        """The kept index, None if there is none or it was computed from other labels."""
+        if self.index_path is None or not self.index_path.exists():
+            return None
+        try:
+            with np.load(self.index_path) as stored:
+                if (stored["shape"].tolist() != key["shape"]
+                        or int(stored["mtime_ns"]) != (key["mtime_ns"] or -1)
+                        or len(stored["nonempty"]) != len(self.labels)):
+                    return None
+                return stored["nonempty"]
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def __len__(self):
+        return len(self.images)
+
+    def sequences(self, prune_empty: bool = True) -> tuple[SampleSequence, SampleSequence]:
+        """(X, Y) sample sequences for training, without empty label images if prune_empty is set."""
+        indices = np.flatnonzero(self.nonempty) if prune_empty else None
+        return SampleSequence(self.images, indices), SampleSequence(self.labels, indices)
+
+    def split(self, val_fraction: float = 0.15, seed: int | None = None, prune_empty: bool = True):
+        """Random ((X_trn, Y_trn), (X_val, Y_val)) split of the samples."""
+        X, Y = self.sequences(prune_empty)
+        order = np.random.default_rng(seed).permutation(len(X))
+        n_val = max(1, int(round(val_fraction * len(X))))
+        return (X.subset(order[n_val:]), Y.subset(order[n_val:])), (X.subset(order[:n_val]), Y.subset(order[:n_val]))
@@ -8,3 +8,31 @@
 
 # def read_text(path: str) -> str:
 #     return Path(path).read_text(encoding="utf-8")
+
+# Attributes are imported on first access, so "import ccipy.stardist_utils" stays fast
+# and stardist/TensorFlow are only loaded once a model is actually used.
+_LAZY_ATTRIBUTES = {
+    "CCIStarDistWrapper": "ccipy.stardist_utils.CCIStarDistWrapper",
+    "AugmentationPipeline": "ccipy.stardist_utils.CCIAugmentation",
+    "ModelRegistry": "ccipy.stardist_utils.CCIModelRegistry",
+    "default_registry": "ccipy.stardist_utils.CCIModelRegistry",
+    "predict_stack": "ccipy.stardist_utils.CCIStackPrediction",
+    "LazyTrainingData": "ccipy.stardist_utils.CCITrainingData",
+    "SampleSequence": "ccipy.stardist_utils.CCITrainingData",
+    "get_sd_model": "ccipy.stardist_utils.CCIStardistUtils",
+    "get_latest_sd_model": "ccipy.stardist_utils.CCIStardistUtils",
+    "prune_empty_labels": "ccipy.stardist_utils.CCIStardistUtils",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from ccipy.stardist_utils.CCIAugmentation import AugmentationPipeline
+from ccipy.stardist_utils.CCIStardistUtils import random_fliprot
+
+
+def test_pipeline_augments_in_float32():
+    pipeline = AugmentationPipeline(seed=1)
+    x = np.ones((16, 16), dtype=np.uint8)
+    y = np.arange(256, dtype=np.uint16).reshape(16, 16)
+    xa, ya = pipeline(x, y)
+    assert xa.dtype == np.float32 and xa.shape == x.shape
+    # labels are only flipped/rotated
+    assert sorted(ya.ravel()) == sorted(y.ravel())
+
+
+def test_batches_cover_every_sample():
+    X = [np.full((8, 8), i, dtype=np.float32) for i in range(10)]
+    Y = [np.full((8, 8), i, dtype=np.uint16) for i in range(10)]
+    pipeline = AugmentationPipeline(n_workers=3, seed=1, max_noise_sigma=0)
+    batches = list(pipeline.batches(X, Y, batch_size=4, epochs=2))
+    assert [len(b[0]) for b in batches] == [4, 4, 2, 4, 4, 2]
+    labels = sorted(int(yb[i, 0, 0]) for _, yb in batches for i in range(len(yb)))
+    assert labels == sorted(list(range(10)) * 2)
+
+
+def test_random_fliprot_uses_given_generator():
+    img = np.arange(24, dtype=np.float32).reshape(4, 6)
+    mask = (img > 10).astype(np.uint16)
+    first = random_fliprot(img, mask, np.random.default_rng(3))
+    second = random_fliprot(img, mask, np.random.default_rng(3))
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
+    assert np.array_equal(first[1], first[0] > 10)
+
+    # without a generator the global numpy state is used, as before
+    np.random.seed(0)
+    x, y = random_fliprot(img, mask)
+    assert sorted(x.shape) == [4, 6] and np.array_equal(y, x > 10)
+
+
+def test_prefetch_keeps_order_of_sequences_and_iterators():
+    pipeline = AugmentationPipeline(n_workers=3)
+    assert list(pipeline.prefetch(list(range(10)), depth=4)) == list(range(10))
+    assert list(pipeline.prefetch(iter(range(10)), depth=4)) == list(range(10))
+    assert list(pipeline.prefetch(iter([]))) == []
+
+
+def test_non_square_batches_keep_their_shape():
+    X = [np.arange(24, dtype=np.float32).reshape(4, 6) for _ in range(8)]
+    Y = [(x > 10).astype(np.uint16) for x in X]
+    pipeline = AugmentationPipeline(n_workers=2, seed=0, intensity_scale=(1, 1), intensity_shift=(0, 0),
+                                    max_noise_sigma=0)
+    for x_batch, y_batch in pipeline.batches(X, Y, batch_size=4):
+        assert x_batch.shape == (4, 4, 6) and y_batch.shape == (4, 4, 6)
+        assert np.array_equal(y_batch, x_batch > 10)
+
+    # an output buffer of another shape is not written to
+    out = np.zeros((6, 4), dtype=np.float32)
+    xa, _ = pipeline(X[0], Y[0], out=out)
+    assert xa.shape == (4, 6) and not out.any()
+
+    with pytest.raises(ValueError, match="one shape"):
+        pipeline.augment_batch([X[0], X[0].T], [Y[0], Y[0].T])
@@ -0,0 +1,32 @@
+import os
+
+from ccipy.stardist_utils.CCIModelRegistry import ModelRegistry
+
+
+def _write_model(basedir, name, mtime_ns):
+    weights = basedir / name / "weights_best.h5"
+    weights.parent.mkdir(parents=True, exist_ok=True)
+    weights.write_bytes(b"")
+    os.utime(weights, ns=(mtime_ns, mtime_ns))
+
+
+def test_registry_caches_until_weights_or_latest_change(tmp_path):
+    loads = []
+    registry = ModelRegistry(max_models=2, loader=lambda name, basedir: loads.append(name) or object())
+    _write_model(tmp_path, "a", 1_000_000_000)
+    _write_model(tmp_path, "b", 1_000_000_000)
+    latest = tmp_path / "latest.mod"
+    latest.write_text("a", encoding="utf-8")
+
+    model_a = registry.get_latest(str(tmp_path), str(latest))
+    assert registry.get("a", str(tmp_path)) is model_a
+    assert loads == ["a"]
+
+    _write_model(tmp_path, "a", 2_000_000_000)
+    assert registry.get("a", str(tmp_path)) is not model_a
+    assert loads == ["a", "a"] and len(registry) == 1
+
+    latest.write_text("b", encoding="utf-8")
+    os.utime(latest, ns=(3_000_000_000, 3_000_000_000))
+    registry.get_latest(str(tmp_path), str(latest))
+    assert loads == ["a", "a", "b"] and "b" in registry
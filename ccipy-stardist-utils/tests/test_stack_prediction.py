@@ -0,0 +1,45 @@
+import threading
+import time
+
+import numpy as np
+
+from ccipy.stardist_utils.CCIStackPrediction import predict_stack
+
+
+def test_predict_stack_links_overlapping_labels():
+    vol = np.zeros((3, 10, 10), dtype=np.uint8)
+    vol[:, 1:5, 1:5] = 1          # object through all slices
+    vol[0, 6:9, 6:9] = 2          # object only in the first slice
+    vol[2, 6:9, 0:3] = 3          # object only in the last slice
+
+    def predict(img):
+        # local labels numbered in a different order per slice
+        labels = np.zeros(img.shape, dtype=np.int32)
+        for new, value in enumerate(sorted(np.unique(img[img > 0]), reverse=True), start=1):
+            labels[img == value] = new
+        return labels
+
+    out = predict_stack(predict, np.moveaxis(vol, 0, 2), axis=2, n_workers=2)
+    assert out.shape == vol.shape
+    assert len({int(out[z, 2, 2]) for z in range(3)}) == 1
+    assert len(np.unique(out[out > 0])) == 3
+    assert out[2, 7, 1] not in (out[0, 2, 2], out[0, 7, 7])
+
+
+def test_predict_fn_is_never_called_concurrently():
+    active, max_active = [0], [0]
+    lock = threading.Lock()
+
+    def predict(img):
+        with lock:
+            active[0] += 1
+            max_active[0] = max(max_active[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        return (img > 0).astype(np.int32)
+
+    vol = np.ones((8, 4, 4), dtype=np.uint8)
+    out = predict_stack(predict, vol, n_workers=4)
+    assert max_active[0] == 1
+    assert np.all(out == 1)
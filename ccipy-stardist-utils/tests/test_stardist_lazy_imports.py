@@ -0,0 +1,21 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = ("csbdeep", "stardist", "tensorflow", "zarr")
+
+
+def run_without(modules, code: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter where importing any of modules fails, installed or not."""
+    block = f"import sys; sys.modules.update(dict.fromkeys({list(modules)!r}))\n"
+    return subprocess.run([sys.executable, "-c", block + code], capture_output=True, text=True)
+
+
+def test_blocked_modules_cannot_be_imported():
+    assert run_without(HEAVY_MODULES, "import stardist.models").returncode != 0
+
+
+def test_import_does_not_load_stardist():
+    code = ("import ccipy.stardist_utils as su; su.CCIStarDistWrapper; su.AugmentationPipeline; "
+            "su.get_sd_model; su.predict_stack; su.LazyTrainingData")
+    res = run_without(HEAVY_MODULES, code)
+    assert res.returncode == 0, res.stderr
@@ -0,0 +1,131 @@
+import threading
+
+import numpy as np
+import pytest
+
+from ccipy.stardist_utils.CCIStarDistWrapper import CCIStarDistWrapper
+
+
+class FakeModel:
+    """Stands in for StarDist2D.predict_instances_big, labels every nonzero pixel per block"""
+    def __init__(self):
+        self.blocks = []
+        self.kwargs = None
+
+    def predict_instances_big(self, img, axes, block_size, min_overlap, context, labels_out, **kwargs):
+        self.kwargs = dict(axes=axes, block_size=block_size, min_overlap=min_overlap, context=context, **kwargs)
+        for y in range(0, img.shape[0], block_size):
+            for x in range(0, img.shape[1], block_size):
+                block = img[y:y + block_size, x:x + block_size]
+                assert isinstance(block, np.ndarray)
+                self.blocks.append(block.shape[:2])
+                mask = block > 0 if block.ndim == 2 else (block > 0).any(axis=-1)
+                labels_out[y:y + block_size, x:x + block_size] = mask * len(self.blocks)
+        return labels_out, {"coord": []}
+
+
+def test_predict_large_reads_dask_blocks_into_labels_out():
+    da = pytest.importorskip("dask.array")
+    image = np.zeros((10, 7), dtype=np.uint16)
+    image[1:3, 1:3] = 5
+    image[8:10, 5:7] = 9
+    model = FakeModel()
+    wrapper = CCIStarDistWrapper(model)
+
+    labels_out = np.full((10, 7), -1, dtype=np.int32)
+    labels, polys = wrapper.predict_large(da.from_array(image, chunks=3), block_size=5, overlap=2, labels_out=labels_out,
+                                          prob_thresh=0.6)
+
+    assert labels is labels_out
+    assert model.blocks == [(5, 5), (5, 2), (5, 5), (5, 2)]
+    assert model.kwargs == dict(axes="YX", block_size=5, min_overlap=2, context=None, prob_thresh=0.6)
+    assert labels[2, 2] == 1 and labels[9, 6] == 4 and labels[0, 0] == 0
+
+
+def test_predict_large_allocates_labels_without_channels():
+    model = FakeModel()
+    labels, _ = CCIStarDistWrapper(model).predict_large(np.ones((4, 6, 2), dtype=np.uint8), block_size=4, axes="YXC")
+    assert labels.shape == (4, 6) and labels.dtype == np.int32
+    assert np.array_equal(np.unique(labels), [1, 2])
+
+
+def test_predict_large_creates_zarr_labels(tmp_path):
+    zarr = pytest.importorskip("zarr")
+    model = FakeModel()
+    labels, _ = CCIStarDistWrapper(model).predict_large(np.ones((6, 6), dtype=np.uint8), block_size=4,
+                                                       labels_out=tmp_path / "labels.zarr")
+    stored = zarr.open(str(tmp_path / "labels.zarr"), mode="r")
+    assert stored.shape == (6, 6) and stored.chunks == (4, 4) and stored.dtype == np.int32
+    assert stored[5, 5] == 4
+
+
+class FakeTrainModel:
+    def __init__(self):
+        self.config = type("Config", (), {"train_sample_cache": True})()
+        self.calls = []
+
+    def train(self, X, Y, **kwargs):
+        self.calls.append(("train", self.config.train_sample_cache))
+
+    def optimize_thresholds(self, X, Y):
+        self.calls.append(("optimize_thresholds", len(X)))
+
+
+def test_train_disables_sample_cache_for_disk_backed_data():
+    from ccipy.stardist_utils.CCITrainingData import SampleSequence
+    X = SampleSequence(np.zeros((4, 8, 8), dtype=np.float32))
+    Y = SampleSequence(np.zeros((4, 8, 8), dtype=np.uint16))
+    model = FakeTrainModel()
+    with pytest.warns(UserWarning, match="train_sample_cache"):
+        CCIStarDistWrapper(model).train(X, Y, validation_data=(X[:1], Y[:1]), epochs=1)
+    assert model.calls == [("train", False), ("optimize_thresholds", 1)]
+
+
+class FakeKerasModel:
+    def __init__(self):
+        self.fit_kwargs = None
+        self.batches = []
+
+    def fit(self, x, steps_per_epoch=None, **kwargs):
+        self.fit_kwargs = kwargs
+        for _ in range(steps_per_epoch):
+            self.batches.append(next(x))
+
+
+class FakeStarDist:
+    """Builds its training batches and calls keras_model.fit like StarDist2D.train"""
+    def __init__(self):
+        self.config = type("Config", (), {})()
+        self.keras_model = FakeKerasModel()
+        self.augment_threads = set()
+
+    def train(self, X, Y, validation_data, augmenter, epochs, workers=1):
+        model = self
+
+        class Batches:
+            def __len__(self):
+                return 6
+
+            def __getitem__(self, i):
+                model.augment_threads.add(threading.current_thread().name)
+                return augmenter(X[i % len(X)], Y[i % len(Y)])
+
+        self.keras_model.fit(iter(Batches()), steps_per_epoch=6, workers=workers, use_multiprocessing=workers > 1)
+
+    def optimize_thresholds(self, X, Y):
+        pass
+
+
+def test_train_prefetches_batches_with_augmentation_pipeline():
+    from ccipy.stardist_utils.CCIAugmentation import AugmentationPipeline
+    X = [np.full((8, 8), i, dtype=np.float32) for i in range(3)]
+    Y = [np.full((8, 8), i, dtype=np.uint16) for i in range(3)]
+    model = FakeStarDist()
+    CCIStarDistWrapper(model).train(X, Y, validation_data=(X, Y), augmenter=AugmentationPipeline(seed=0),
+                                    epochs=1, workers=4)
+
+    assert [int(y[0, 0]) for _, y in model.keras_model.batches] == [0, 1, 2, 0, 1, 2]
+    # batches were prepared on the pipeline's threads, never in forked keras workers
+    assert model.augment_threads and all(name.startswith("augment") for name in model.augment_threads)
+    assert model.keras_model.fit_kwargs["workers"] == 1 and not model.keras_model.fit_kwargs["use_multiprocessing"]
+    assert "fit" not in vars(model.keras_model)
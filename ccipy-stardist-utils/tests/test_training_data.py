@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+from ccipy.stardist_utils.CCITrainingData import LazyTrainingData, index_key
+
+
+def test_npy_dataset_prunes_with_cached_index(tmp_path):
+    images = np.arange(5 * 4 * 4, dtype=np.float32).reshape(5, 4, 4)
+    labels = np.zeros((5, 4, 4), dtype=np.uint16)
+    labels[[1, 3], 2, 2] = 1
+    np.save(tmp_path / "images.npy", images)
+    np.save(tmp_path / "labels.npy", labels)
+
+    data = LazyTrainingData.from_npy(tmp_path / "images.npy", tmp_path / "labels.npy")
+    X, Y = data.sequences()
+    assert len(X) == 2
+    np.testing.assert_array_equal(X[1], images[3])
+    assert (tmp_path / "labels.nonempty.npz").exists()
+
+    (trn_X, _), (val_X, _) = LazyTrainingData.from_npy(tmp_path / "images.npy", tmp_path / "labels.npy").split(0.5, seed=0)
+    assert len(trn_X) + len(val_X) == 2
+
+
+def test_kept_index_is_recomputed_for_changed_labels(tmp_path):
+    images = np.zeros((3, 4, 4), dtype=np.float32)
+    labels = np.zeros((3, 4, 4), dtype=np.uint16)
+    labels[0, 1, 1] = 1
+    np.save(tmp_path / "images.npy", images)
+    np.save(tmp_path / "labels.npy", labels)
+    index_path = tmp_path / "labels.nonempty.npz"
+    assert LazyTrainingData.from_npy(tmp_path / "images.npy", tmp_path / "labels.npy").nonempty.tolist() == [
+        True, False, False]
+
+    # same shape, rewritten labels
+    labels[2, 1, 1] = 1
+    np.save(tmp_path / "labels.npy", labels)
+    os.utime(tmp_path / "labels.npy", ns=(1, os.stat(index_path).st_mtime_ns + 1_000_000_000))
+    assert LazyTrainingData.from_npy(tmp_path / "images.npy", tmp_path / "labels.npy").nonempty.tolist() == [
+        True, False, True]
+
+    # more samples
+    np.save(tmp_path / "images.npy", np.zeros((4, 4, 4), dtype=np.float32))
+    np.save(tmp_path / "labels.npy", np.ones((4, 4, 4), dtype=np.uint16))
+    assert LazyTrainingData.from_npy(tmp_path / "images.npy", tmp_path / "labels.npy").nonempty.tolist() == [True] * 4
+
+    with pytest.raises(ValueError):
+        LazyTrainingData(images, labels, nonempty=np.ones(2, dtype=bool))
+
+
+def test_index_notices_writes_in_nested_directories(tmp_path):
+    labels = np.zeros((2, 4, 4), dtype=np.uint16)
+    chunk_dir = tmp_path / "labels" / "0" / "0"
+    chunk_dir.mkdir(parents=True)
+    index_path = tmp_path / "labels.nonempty.npz"
+    data = LazyTrainingData(np.zeros_like(labels), labels, index_path=index_path, source_path=tmp_path / "labels")
+    assert data.nonempty.tolist() == [False, False]
+
+    # a chunk rewritten two levels down only changes the mtime of its own directory
+    labels[1, 0, 0] = 2
+    (chunk_dir / "1").write_bytes(b"chunk")
+    os.utime(chunk_dir, ns=(1, os.stat(index_path).st_mtime_ns + 1_000_000_000))
+    data = LazyTrainingData(np.zeros_like(labels), labels, index_path=index_path, source_path=tmp_path / "labels")
+    assert data.nonempty.tolist() == [False, True]
+
+
+def test_zarr_index_is_kept_next_to_the_store(tmp_path):
+    zarr = pytest.importorskip("zarr")
+    group = zarr.open(str(tmp_path / "data.zarr"), mode="w")
+    group["images"] = np.zeros((2, 4, 4), dtype=np.float32)
+    group["labels"] = np.zeros((2, 4, 4), dtype=np.uint16)
+    group["labels"][1, 0, 0] = 3
+
+    data = LazyTrainingData.from_zarr(tmp_path / "data.zarr")
+    assert data.nonempty.tolist() == [False, True]
+    assert (tmp_path / "data.labels.nonempty.npz").exists()
+    assert "nonempty" not in zarr.open(str(tmp_path / "data.zarr"), mode="r").attrs
+    reopened = LazyTrainingData.from_zarr(tmp_path / "data.zarr")
+    assert reopened._load_index(index_key(reopened.labels, reopened.source_path)).tolist() == [False, True]
+
+
+def test_unwritable_index_is_skipped(tmp_path):
+    labels = np.ones((2, 4, 4), dtype=np.uint16)
+    index_path = tmp_path / "missing" / "labels.nonempty.npz"
+    data = LazyTrainingData(np.zeros_like(labels), labels, index_path=index_path)
+    assert data.nonempty.tolist() == [True, True]
+    assert not index_path.exists()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+    Measure the import time of ccipy modules with python -X importtime.
+
+    Each module is imported in a fresh interpreter, the total and the slowest
+    top level dependencies (cumulative time) are reported.
+    Example:
+        python benchmarks/bench_import_time.py ccipy.stardist_utils ccipy.img_utils.maps_to_ome_zarr --top 5
+"""
+import argparse
+import subprocess
+import sys
+
+
+def import_times(module: str) -> list[tuple[str, int, int]]:
+    """(name, level, cumulative us) of every module imported by "import module", in import order."""
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in res.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), (len(name) - len(name.lstrip())) // 2, int(cumulative)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=["ccipy.utils", "ccipy.img_utils.maps_to_ome_zarr",
+                                                       "ccipy.atlas", "ccipy.omero", "ccipy.stardist_utils"])
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            rows = import_times(module)
+        except subprocess.CalledProcessError as e:
+            print(f"{module}: import failed\n{e.stderr.strip().splitlines()[-1]}")
+            continue
+        # a module is printed after everything it imports, those lines are indented deeper
+        end = max(i for i, r in enumerate(rows) if r[0] == module)
+        level = rows[end][1]
+        start = end
+        while start > 0 and rows[start - 1][1] > level:
+            start -= 1
+        direct = sorted((r for r in rows[start:end] if r[1] == level + 1), key=lambda r: -r[2])
+        print(f"{module}: {rows[end][2] / 1000:.1f} ms, {end - start + 1} modules")
+        for name, _, cumulative in direct[:args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,14 @@
 
+from __future__ import annotations
 from ccipy.utils import string_utils
 from pathlib import Path
-import dask.array as da
+from typing import TYPE_CHECKING
 import numpy as np
-from ome_zarr.io import parse_url
-from ome_zarr.writer import write_multiscale
-import pandas as pd
 #import skimage.io as skio
-import imageio.v3 as iio
-import xmltodict
-import zarr
-import zarr.storage
-import zarr.creation
+# dask, pandas, zarr, ome_zarr, imageio and xmltodict take seconds to import together,
+# they are imported in the functions that use them so importing this module stays fast
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def find_image_pyramids(maps_proj_path: Path, pyramid_file_name: str = "pyramid.xml") -> list[Path]:
@@ -49,6 +46,8 @@ def get_pyramid_data_path(pyramid_file_folder: Path, default_folder_name: str =
 def get_first_tile(pyramid_data_path: Path, level: int = 0, column: int = 0, expected_tile_name: str = "tile_0.tif"):
     """ Get the first tile image from the pyramid data path."""
     
+    import imageio.v3 as iio
+
     lvl_path = pyramid_data_path.joinpath(f"l_{level}", f"c_{column}")
     tile_path = lvl_path.joinpath(expected_tile_name)
     tile_img = iio.imread(tile_path)
@@ -57,7 +56,8 @@ def get_first_tile(pyramid_data_path: Path, level: int = 0, column: int = 0, exp
 
 def get_channel_name(image_pyramid: Path, params_file: str = "MultiChannelParams.xml"):
     """ Get the channel name from the MultiChannelParams.xml file in the image pyramid folder."""
-    
+    import xmltodict
+
     with open(image_pyramid.joinpath(params_file), "rb") as f:
         multichannel_dict = xmltodict.parse(f, xml_attribs=True)
 
@@ -93,6 +93,7 @@ def read_pyramid_metadata(pyramid_data_path: Path, dict_file: str = "pyramid.xml
         Returns:
             PyramidMetadata object containing the metadata.
     """
+    import xmltodict
 
     with open(pyramid_data_path.joinpath(dict_file), "rb") as f:
         pyramid_dict = xmltodict.parse(f, xml_attribs=True)
@@ -102,7 +103,8 @@ def read_pyramid_metadata(pyramid_data_path: Path, dict_file: str = "pyramid.xml
 
 
 def get_col_df(col_folder: Path, pyramid_meta_data: PyramidMetadata, dtype) -> pd.DataFrame:
-    
+    import pandas as pd
+
     c_name = col_folder.name
     col_tiles = [f for f in col_folder.iterdir() if f.is_file and f.name.endswith('.tif')]
 
@@ -166,6 +168,14 @@ def store_zarr_image(output_dir: Path, img_id: str, pyramid_meta_data: PyramidMe
             res_dtype: Data type of the resulting image.
             remove_if_exists (bool): Whether to remove the existing OME-Zarr file if it exists.
     """
+    import dask.array as da
+    import imageio.v3 as iio
+    import zarr
+    import zarr.creation
+    import zarr.storage
+    from ome_zarr.io import parse_url
+    from ome_zarr.writer import write_multiscale
+
     z0_path = output_dir.joinpath(f"./{img_id}.zarr")
     
     if z0_path.exists():
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = ("dask", "imageio", "ome_zarr", "pandas", "xmltodict", "zarr")
+
+
+def run_without(modules, code: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter where importing any of modules fails, installed or not."""
+    block = f"import sys; sys.modules.update(dict.fromkeys({list(modules)!r}))\n"
+    return subprocess.run([sys.executable, "-c", block + code], capture_output=True, text=True)
+
+
+def test_blocked_modules_cannot_be_imported():
+    assert run_without(HEAVY_MODULES, "import dask.array").returncode != 0
+
+
+def test_import_defers_heavy_dependencies():
+    res = run_without(HEAVY_MODULES, "import ccipy.img_utils.maps_to_ome_zarr")
+    assert res.returncode == 0, res.stderr